@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, Response, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.schemas.auth_schema import AuthRequest
 from app.api.v1.schemas.token_schema import TokenResponse
@@ -15,14 +15,14 @@ router = APIRouter()
 
 
 @router.post("/authenticate", response_model=TokenResponse, status_code=status.HTTP_200_OK)
-def login_json(
+async def login_json(
     data: AuthRequest,
     response: Response,
-    session: Session = Depends(db_client.get_session),
+    session: AsyncSession = Depends(db_client.get_async_session),
 ):
     user_repo = UserRepository(session)
     service = AuthService(user_repo)
-    user = service.authenticate(data.name, data.password)
+    user = await service.authenticate(data.name, data.password)
 
     access_token = create_token_for_user(user)
     set_auth_cookie(response, access_token)
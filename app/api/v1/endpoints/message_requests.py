@@ -0,0 +1,120 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from typing import Literal
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.schemas.message_request_schema import MessageRequestStatusResponse
+from app.core.logger import get_logger
+from app.core.security import get_current_user
+from app.core.settings import settings
+from app.infra.db.db_client import db_client
+from app.infra.db.models import MessageRequest, User
+from app.infra.db.repositories.message_recipient_repository import MessageRecipientRepository
+from app.services.progress_hub import is_finished, progress_hub
+from app.utils.report_utils import build_rejected_rows_csv, build_rejected_rows_xlsx
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+REPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Desliga o buffer de proxies (nginx) para os eventos chegarem na hora.
+    "X-Accel-Buffering": "no",
+}
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+@router.get(
+    "/message_requests/{message_request_id}",
+    response_model=MessageRequestStatusResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_message_request_status(
+    message_request_id: int,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(db_client.get_async_session),
+):
+    request = await get_owned_message_request(session, message_request_id, current_user)
+    return MessageRequestStatusResponse.model_validate(request)
+
+
+@router.get(
+    "/message_requests/{message_request_id}/rejected",
+    status_code=status.HTTP_200_OK,
+)
+async def download_rejected_rows(
+    message_request_id: int,
+    report_format: Literal["csv", "xlsx"] = Query("csv", alias="format"),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(db_client.get_async_session),
+):
+    await get_owned_message_request(session, message_request_id, current_user)
+
+    recipients = await MessageRecipientRepository(session).list_rejected(message_request_id)
+    if report_format == "xlsx":
+        content = await asyncio.to_thread(build_rejected_rows_xlsx, recipients)
+    else:
+        content = build_rejected_rows_csv(recipients)
+
+    filename = f"message_request_{message_request_id}_rejeitados.{report_format}"
+    return Response(
+        content=content,
+        media_type=REPORT_MEDIA_TYPES[report_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def get_owned_message_request(
+    session: AsyncSession,
+    message_request_id: int,
+    current_user: User,
+) -> MessageRequest:
+    # Campanha de outro usuario responde como inexistente: os ids sao sequenciais.
+    request = await session.get(MessageRequest, message_request_id)
+    if request is None or request.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="MessageRequest nao encontrado")
+    return request
+
+
+@router.get(
+    "/message_requests/{message_request_id}/events",
+    status_code=status.HTTP_200_OK,
+)
+async def stream_message_request_events(
+    message_request_id: int,
+    current_user: User = Depends(get_current_user),
+):
+    # Sem sessao por request: a conexao fica aberta enquanto o cliente acompanha e o
+    # progresso vem do hub compartilhado (uma assinatura no banco para todos os clientes).
+    # A sessao curta abaixo so confere o dono e fecha antes do stream comecar.
+    async with db_client.AsyncSessionLocal() as session:
+        await get_owned_message_request(session, message_request_id, current_user)
+    return StreamingResponse(
+        progress_events(message_request_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def progress_events(message_request_id: int) -> AsyncIterator[bytes]:
+    updates = progress_hub.updates(message_request_id, settings.PROGRESS_SSE_KEEPALIVE_SECONDS)
+    # aclosing: ao terminar (campanha finalizada ou cliente desconectado) a inscricao no
+    # hub e removida na hora, sem esperar o coletor de lixo.
+    async with aclosing(updates):
+        async for progress in updates:
+            if progress is None:
+                yield SSE_KEEPALIVE
+                continue
+            yield b"event: progress\ndata: " + orjson.dumps(progress) + b"\n\n"
+            if is_finished(progress):
+                return
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.schemas.folha_ponto_schema import FolhaPontoUploadRequest
 from app.core.logger import get_logger
@@ -12,17 +12,22 @@ logger = get_logger(__name__)
 
 router = APIRouter()
 
-@router.post("/send_folha_ponto_ativos", status_code=status.HTTP_200_OK)
+@router.post("/send_folha_ponto_ativos", status_code=status.HTTP_202_ACCEPTED)
 async def send_folha_ponto_ativos(
     payload: FolhaPontoUploadRequest = Depends(FolhaPontoUploadRequest.as_form),
-    session: Session = Depends(db_client.get_session),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(db_client.get_async_session),
 ):
     service = FolhaPontoAtivosService(session=session)
-    return await service.loop_folha_ponto_ativos(
+    return await service.create_ingestion_job(
         file=payload.file,
         column_name=payload.column_name,
         column_month=payload.column_month,
         column_contact=payload.column_contact,
-        user_id=1,
+        user_id=current_user.id,
         template_type=payload.template_type,
+        scheduled_at=payload.scheduled_at,
+        send_window_start=payload.send_window_start,
+        send_window_end=payload.send_window_end,
+        messages_per_minute=payload.messages_per_minute,
     )
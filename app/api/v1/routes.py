@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints.auth import router as auth_router
+from app.api.v1.endpoints.message_requests import router as message_requests_router
 from app.api.v1.endpoints.security import router as security_router
 from app.api.v1.endpoints.send_folha_ponto_ativos import router as send_folha_ponto_ativos_router
 from app.core.logger import get_logger
@@ -10,6 +11,7 @@ router = APIRouter()
 router.include_router(auth_router, tags=["auth"])
 router.include_router(security_router, tags=["security"])
 router.include_router(send_folha_ponto_ativos_router, tags=["folha_ponto"])
+router.include_router(message_requests_router, tags=["message_requests"])
 
 
 @router.get("/health", summary="Health Check Endpoint")
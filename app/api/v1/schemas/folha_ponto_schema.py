@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from datetime import datetime, time
 from fastapi import File, Form, UploadFile
 from app.core.logger import get_logger
 
@@ -11,6 +12,11 @@ class FolhaPontoUploadRequest:
     column_month: str
     column_contact: str
     template_type: str = "FP"
+    # Opcionais: com qualquer um deles a campanha e despachada pelo campaign_dispatcher.
+    scheduled_at: datetime | None = None
+    send_window_start: time | None = None
+    send_window_end: time | None = None
+    messages_per_minute: int | None = None
 
     @classmethod
     def as_form(
@@ -20,6 +26,10 @@ class FolhaPontoUploadRequest:
         column_month: str = Form(...),
         column_contact: str = Form(...),
         template_type: str = Form("FP"),
+        scheduled_at: datetime | None = Form(None),
+        send_window_start: time | None = Form(None),
+        send_window_end: time | None = Form(None),
+        messages_per_minute: int | None = Form(None),
     ):
         return cls(
             file=file,
@@ -27,4 +37,8 @@ class FolhaPontoUploadRequest:
             column_month=column_month,
             column_contact=column_contact,
             template_type=template_type,
+            scheduled_at=scheduled_at,
+            send_window_start=send_window_start,
+            send_window_end=send_window_end,
+            messages_per_minute=messages_per_minute,
         )
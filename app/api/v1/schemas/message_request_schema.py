@@ -0,0 +1,26 @@
+from datetime import datetime, time
+
+from pydantic import BaseModel, ConfigDict
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageRequestStatusResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    status: str
+    template_type: str
+    parsed_rows: int
+    rejected_rows: int
+    published_messages: int
+    send_messages: int
+    failed_messages: int
+    error: str | None = None
+    created_at: datetime
+    scheduled_at: datetime | None = None
+    send_window_start: time | None = None
+    send_window_end: time | None = None
+    messages_per_minute: int | None = None
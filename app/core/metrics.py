@@ -0,0 +1,135 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest, start_http_server
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Metricas em formato Prometheus, no registro padrao do processo. Cada processo (API,
+# worker) expoe as proprias: a API em GET /metrics e o worker em METRICS_WORKER_PORT.
+# No caminho quente, os filhos com labels fixos (por fila) sao resolvidos uma vez e
+# reaproveitados; gravar uma amostra e um incremento sob lock, sem I/O.
+
+# Buckets para tempos por linha de arquivo (microssegundos a poucos milissegundos).
+ROW_SECONDS_BUCKETS = (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+# Buckets para chamadas de rede e banco (milissegundos a dezenas de segundos).
+IO_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "Requisicoes HTTP atendidas pela API.",
+    ["method", "handler", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latencia das requisicoes HTTP da API.",
+    ["method", "handler"],
+    buckets=IO_SECONDS_BUCKETS,
+)
+
+WORKER_MESSAGES_CONSUMED = Counter(
+    "worker_messages_consumed_total",
+    "Mensagens AMQP recebidas pelo worker, por fila.",
+    ["queue"],
+)
+WORKER_SENDS_IN_FLIGHT = Gauge(
+    "worker_sends_in_flight",
+    "Mensagens em processamento (envio para a Meta ainda sem resultado), por fila.",
+    ["queue"],
+)
+WORKER_BACKUP_MESSAGES = Counter(
+    "worker_backup_messages_total",
+    "Mensagens movidas para a fila de backup, por fila de origem.",
+    ["source_queue"],
+)
+
+META_REQUEST_SECONDS = Histogram(
+    "meta_request_duration_seconds",
+    "Latencia das chamadas a Meta Cloud API, por status HTTP (error = falha de transporte).",
+    ["status"],
+    buckets=IO_SECONDS_BUCKETS,
+)
+
+RABBITMQ_PUBLISHED = Counter(
+    "rabbitmq_published_messages_total",
+    "Mensagens AMQP confirmadas pelo broker, por fila.",
+    ["queue"],
+)
+RABBITMQ_CONFIRM_SECONDS = Histogram(
+    "rabbitmq_publish_confirm_seconds",
+    "Tempo entre o envio de uma mensagem e a confirmacao do broker (publisher confirm).",
+    ["queue"],
+    buckets=IO_SECONDS_BUCKETS,
+)
+
+UPLOAD_PARSE_ROW_SECONDS = Histogram(
+    "upload_parse_row_seconds",
+    "Tempo de parse por linha do arquivo enviado, por formato (medido por bloco no processo de parse).",
+    ["format"],
+    buckets=ROW_SECONDS_BUCKETS,
+)
+
+DISPATCHER_PUBLISHED = Counter(
+    "dispatcher_published_messages_total",
+    "Destinatarios de campanhas ritmadas publicados pelo dispatcher.",
+)
+DISPATCHER_THROTTLED = Counter(
+    "dispatcher_throttled_cycles_total",
+    "Ciclos do dispatcher sem publicacao por fila cheia (DISPATCH_MAX_QUEUE_DEPTH).",
+)
+
+DELIVERY_FLUSH_SECONDS = Histogram(
+    "delivery_counter_flush_seconds",
+    "Duracao da gravacao write-behind de contadores e resultados por destinatario.",
+    buckets=IO_SECONDS_BUCKETS,
+)
+
+
+def observe_rows(histogram: Histogram, elapsed_seconds: float, rows: int) -> None:
+    # Um bloco vira uma amostra de tempo medio por linha; nao ha custo por linha.
+    if rows > 0:
+        histogram.observe(elapsed_seconds / rows)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def start_metrics_server(port: int) -> None:
+    if port <= 0:
+        return
+    start_http_server(port)
+    logger.info("Metricas Prometheus expostas na porta %s", port)
+
+
+class MetricsMiddleware:
+    # Middleware ASGI puro (sem BaseHTTPMiddleware): nao envolve o corpo da resposta e
+    # mantem respostas em streaming intactas. O label handler e o nome da funcao da rota
+    # (ex.: get_message_request_status), nunca o path com ids.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            handler = getattr(scope.get("route"), "name", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.labels(method, handler, str(status_code)).inc()
+            HTTP_REQUEST_SECONDS.labels(method, handler).observe(time.perf_counter() - started)
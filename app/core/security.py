@@ -1,20 +1,30 @@
+import time
 from datetime import datetime, timedelta, timezone
 
-from fastapi import Cookie, Depends, HTTPException, Request, status
+from fastapi import Cookie, HTTPException, Request, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
 
 from app.core.logger import get_logger
 from app.core.settings import settings
 from app.infra.db.db_client import db_client
 from app.infra.db.models import User
+from app.utils.cache import TTLCache
 
 logger = get_logger(__name__)
 
 # New passwords use bcrypt_sha256 (supports long passwords), while bcrypt is kept for compatibility.
 pwd_context = CryptContext(schemes=["bcrypt_sha256", "bcrypt"], deprecated="auto")
 
+# Claims de tokens ja verificados (chave: token) e usuarios autenticados (chave: id),
+# para que requests autenticados nao decodifiquem o JWT nem consultem o banco a cada chamada.
+token_claims_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS
+)
+user_cache = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -24,6 +34,11 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_update(hashed_password: str) -> bool:
+    # Hash em esquema deprecated (deprecated="auto": tudo que nao e o esquema padrao).
+    return pwd_context.needs_update(hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
@@ -39,7 +54,6 @@ def get_current_user(
     request: Request,
     cookie_token: str | None = Cookie(default=None, alias=settings.JWT_COOKIE_NAME),
     csrf_cookie: str | None = Cookie(default=None, alias=settings.JWT_CSRF_COOKIE_NAME),
-    session: Session = Depends(db_client.get_session),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,14 +74,52 @@ def get_current_user(
             )
 
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = session.get(User, int(user_id))
+    user = get_user_by_id(int(user_id))
     if user is None:
         raise credentials_exception
     return user
+
+
+def decode_access_token(token: str) -> dict:
+    payload = token_claims_cache.get(token)
+    if payload is not None:
+        # A validade do cache nunca passa do exp do token.
+        return payload
+
+    payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    expires_at = payload.get("exp")
+    token_claims_cache.set(
+        token,
+        payload,
+        ttl_seconds=expires_at - time.time() if isinstance(expires_at, (int, float)) else None,
+    )
+    return payload
+
+
+def get_user_by_id(user_id: int) -> User | None:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    # Sessao aberta apenas no cache miss; o usuario sai da sessao (expunge) ja carregado.
+    with db_client.SessionLocal() as session:
+        user = session.get(User, user_id)
+        if user is None:
+            return None
+        session.expunge(user)
+    user_cache.set(user_id, user)
+    return user
+
+
+def invalidate_user_cache(user_id: int | None = None) -> None:
+    if user_id is None:
+        user_cache.clear()
+        return
+    user_cache.discard(user_id)
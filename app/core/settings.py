@@ -7,8 +7,18 @@ logger = logging.getLogger(__name__)
 class Settings(BaseSettings):
     PROJECT_FASTAPI_NAME: str
     DATABASE_URL: str
+    # Opcional; por padrao derivado do DATABASE_URL trocando o driver (ex.: postgresql+asyncpg).
+    DATABASE_ASYNC_URL: str | None = None
     DEBUG: bool = False
 
+    # Pool de conexoes do banco (aplicado as engines sincrona e assincrona)
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
     # RabbitMQ
     RABBITMQ_USER: str
     RABBITMQ_PASSWORD: str
@@ -21,6 +31,11 @@ class Settings(BaseSettings):
     RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS_TORRE: str
     RABBITMQ_QUEUE_VAGAS: str
     RABBITMQ_QUEUE_FOLHA_PONTO_BACKUP: str = "folha_ponto_backup_queue"
+    RABBITMQ_PUBLISH_WINDOW: int = 500
+    # Formato das mensagens publicadas: application/json (orjson) ou application/msgpack.
+    RABBITMQ_CONTENT_TYPE: str = "application/json"
+    # Destinatarios por mensagem AMQP na publicacao da ingestao (1 = uma mensagem por destinatario).
+    RABBITMQ_PUBLISH_BATCH_SIZE: int = 1
 
     JWT_SECRET_KEY: str = "change-this-secret-in-env"
     JWT_ALGORITHM: str = "HS256"
@@ -31,11 +46,89 @@ class Settings(BaseSettings):
     JWT_COOKIE_PATH: str = "/"
     JWT_CSRF_COOKIE_NAME: str = "csrf_token"
     JWT_CSRF_HEADER_NAME: str = "X-CSRF-Token"
+    # Cache de tokens verificados e usuarios autenticados (get_current_user).
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    # Pool dedicado ao bcrypt (login/cadastro); acima de PASSWORD_HASH_MAX_PENDING responde 503.
+    PASSWORD_HASH_MAX_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32
     CORS_ALLOW_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000,http://localhost:5173,http://127.0.0.1:5173"
 
+    # Ingestao de planilhas (.xlsx, .csv e .parquet usam os mesmos limites XLSX_*)
+    XLSX_STREAM_CHUNK_SIZE: int = 1000
+    UPLOAD_DIR: str = "/tmp/send_message_uploads"
+    XLSX_PARSE_MAX_WORKERS: int = 2
+    XLSX_PARSE_QUEUE_CHUNKS: int = 4
+    INGESTION_MAX_CONCURRENT_JOBS: int = 2
+    INGESTION_MAX_QUEUED_JOBS: int = 8
+    # Na subida da API, marca como "failed" os jobs que ficaram em "parsing" (API encerrada
+    # no meio da ingestao) e remove os uploads orfaos. Desative se houver mais de um
+    # processo da API: o sweep de um processo derrubaria os jobs em andamento nos outros.
+    INGESTION_RECOVER_ON_STARTUP: bool = True
+
     # Meta WhatsApp API
     META_MESSAGES_URL: str = "https://graph.facebook.com/v22.0/934626919742007/messages"
     WHATSAPP_TOKEN: str = ""
+    META_HTTP_TIMEOUT_SECONDS: float = 30.0
+    META_HTTP2: bool = False
+    META_HTTP_MAX_CONNECTIONS: int = 100
+    META_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    META_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    # Limite de envios por segundo para a Meta (por processo do worker), com ajuste adaptativo.
+    META_RATE_LIMIT_PER_SECOND: float = 80.0
+    META_RATE_LIMIT_MIN_PER_SECOND: float = 1.0
+    META_RATE_LIMIT_BURST: int = 10
+    META_RATE_LIMIT_DECREASE_FACTOR: float = 0.7
+    META_RATE_LIMIT_INCREASE_STEP: float = 2.0
+    META_RATE_LIMIT_RECOVERY_SECONDS: float = 5.0
+    # Atrasos (segundos) das filas de retry por tentativa; a ultima faixa se repete ate o limite.
+    META_RETRY_DELAYS_SECONDS: list[int] = [5, 30, 300]
+    META_RETRY_MAX_ATTEMPTS: int = 3
+    # Intervalo de gravacao (write-behind) dos contadores de envio no banco.
+    DELIVERY_COUNTER_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Janela do flush antecipado pelo worker antes do ack: agrupa os envios concluidos nela.
+    DELIVERY_COUNTER_GROUP_COMMIT_SECONDS: float = 0.02
+    # Envios simultaneos por fila no worker (tambem usado como prefetch do canal).
+    META_WORKER_CONCURRENCY: int = 16
+    # Sobrescrita por fila em JSON, ex: {"vagas_queue": 4}
+    META_WORKER_QUEUE_CONCURRENCY: dict[str, int] = {}
+    # Chaves de idempotencia ja enviadas mantidas em memoria por processo do worker.
+    META_IDEMPOTENCY_CACHE_SIZE: int = 100_000
+
+    # Despacho ritmado de campanhas (app.workers.campaign_dispatcher)
+    # Fuso da janela de envio e das datas de agendamento informadas sem fuso.
+    DISPATCH_TIMEZONE: str = "America/Sao_Paulo"
+    DISPATCH_INTERVAL_SECONDS: float = 1.0
+    # Maximo publicado por campanha a cada ciclo quando ela nao tem messages_per_minute.
+    DISPATCH_BATCH_SIZE: int = 500
+    # Mensagens prontas na fila acima das quais o dispatcher espera o worker consumir.
+    DISPATCH_MAX_QUEUE_DEPTH: int = 5000
+    # Reservas ("claimed") sem publish confirmado ha mais que isso voltam para "pending".
+    DISPATCH_CLAIM_TIMEOUT_SECONDS: float = 300.0
+    METRICS_DISPATCHER_PORT: int = 9200
+
+    # Progresso em tempo real (SSE em /message_requests/{id}/events): o worker e a ingestao
+    # publicam NOTIFY nesse canal; fora do Postgres a API consulta o banco a cada intervalo.
+    PROGRESS_NOTIFY_CHANNEL: str = "message_request_progress"
+    PROGRESS_POLL_INTERVAL_SECONDS: float = 2.0
+    # Janela usada no calculo da taxa de envio (e do ETA) de cada campanha.
+    PROGRESS_RATE_WINDOW_SECONDS: float = 60.0
+    # Comentario SSE enviado sem atualizacoes, para proxies nao fecharem a conexao.
+    PROGRESS_SSE_KEEPALIVE_SECONDS: float = 15.0
+
+    # Porta HTTP das metricas Prometheus do worker (0 desativa); a API expoe em GET /metrics.
+    # Com o supervisor, o processo i usa METRICS_WORKER_PORT + i.
+    METRICS_WORKER_PORT: int = 9100
+
+    # Supervisor de workers (app.workers.supervisor): processos consumindo todas as filas.
+    WORKER_PROCESSES: int = 1
+    # Filas de cada processo em JSON, ex: [["folha_ponto_ativos_queue"], ["vagas_queue"]];
+    # quando preenchido substitui WORKER_PROCESSES (uma fila pode aparecer em varios processos).
+    WORKER_QUEUE_ASSIGNMENT: list[list[str]] = []
+    # Prazo no SIGTERM para os envios em andamento terminarem antes de voltarem para a fila.
+    WORKER_SHUTDOWN_GRACE_SECONDS: float = 25.0
+    # Espera maxima entre reinicios de um processo que cai seguidamente.
+    WORKER_RESTART_MAX_BACKOFF_SECONDS: float = 60.0
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -1,4 +1,7 @@
-from sqlalchemy import create_engine, inspect, text
+from importlib.util import find_spec
+
+from sqlalchemy import create_engine, inspect, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.logger import get_logger
@@ -7,37 +10,105 @@ from app.infra.db.models import Base
 
 logger = get_logger(__name__)
 
+# Driver assincrono usado para cada backend do DATABASE_URL sincrono, com o modulo que
+# precisa estar instalado (aiosqlite vem do extra "sqlite").
+ASYNC_DRIVERS = {
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+}
+
+# Colunas adicionadas depois da criacao inicial de cada tabela.
+COLUMN_MIGRATIONS = {
+    "message_requests": {
+        "send_messages": "INTEGER NOT NULL DEFAULT 0",
+        "parsed_rows": "INTEGER NOT NULL DEFAULT 0",
+        "rejected_rows": "INTEGER NOT NULL DEFAULT 0",
+        "failed_messages": "INTEGER NOT NULL DEFAULT 0",
+        "error": "VARCHAR",
+        "scheduled_at": "TIMESTAMP",
+        "send_window_start": "TIME",
+        "send_window_end": "TIME",
+        "messages_per_minute": "INTEGER",
+    },
+    "message_recipients": {
+        "idempotency_key": "VARCHAR",
+        "name": "VARCHAR",
+        "month_folha_ponto": "VARCHAR",
+        "claimed_at": "TIMESTAMP",
+    },
+}
+
 
 class DbClient:
     def __init__(self):
         self.db_url = settings.DATABASE_URL
-        self.engine = create_engine(self.db_url, echo=True, future=True)
+        self.async_db_url = settings.DATABASE_ASYNC_URL or self.build_async_url(self.db_url)
+        self.engine = create_engine(self.db_url, future=True, **self.engine_options())
         self.SessionLocal = self.create_session_factory()
+        # Engine assincrona para os caminhos quentes (upload, status, worker), sem bloquear o event loop.
+        self.async_engine = create_async_engine(self.async_db_url, **self.engine_options())
+        self.AsyncSessionLocal = self.create_async_session_factory()
+
+    def engine_options(self) -> dict:
+        options = {
+            "echo": settings.DB_ECHO,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        }
+        if not self.db_url.startswith("sqlite"):
+            options["pool_size"] = settings.DB_POOL_SIZE
+            options["max_overflow"] = settings.DB_MAX_OVERFLOW
+            options["pool_timeout"] = settings.DB_POOL_TIMEOUT_SECONDS
+        return options
+
+    def build_async_url(self, db_url: str) -> str:
+        url = make_url(db_url)
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f"DATABASE_URL sem driver assincrono conhecido: {backend}")
+        drivername, module = ASYNC_DRIVERS[backend]
+        if find_spec(module) is None:
+            raise ValueError(
+                f"DATABASE_URL {backend} requer o driver assincrono '{module}' "
+                f"(defina DATABASE_ASYNC_URL ou instale {module})"
+            )
+        return url.set(drivername=drivername).render_as_string(hide_password=False)
 
     def create_session_factory(self):
         return sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
+    def create_async_session_factory(self):
+        return async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+
     def create_tables(self):
         Base.metadata.create_all(bind=self.engine)
-        self.ensure_message_requests_columns()
+        self.ensure_columns()
 
-    def ensure_message_requests_columns(self):
+    def ensure_columns(self):
         inspector = inspect(self.engine)
-        if "message_requests" not in inspector.get_table_names():
-            return
-
-        existing_columns = {col["name"] for col in inspector.get_columns("message_requests")}
-        if "send_messages" in existing_columns:
-            return
-
-        # Backward-compatible migration for existing databases.
-        with self.engine.begin() as connection:
-            connection.execute(
-                text(
-                    "ALTER TABLE message_requests "
-                    "ADD COLUMN send_messages INTEGER NOT NULL DEFAULT 0"
-                )
-            )
+        table_names = set(inspector.get_table_names())
+        for table_name, migrations in COLUMN_MIGRATIONS.items():
+            if table_name not in table_names:
+                continue
+
+            existing_columns = {col["name"] for col in inspector.get_columns(table_name)}
+            missing_columns = {
+                name: definition
+                for name, definition in migrations.items()
+                if name not in existing_columns
+            }
+            if not missing_columns:
+                continue
+
+            # Backward-compatible migration for existing databases.
+            with self.engine.begin() as connection:
+                for name, definition in missing_columns.items():
+                    connection.execute(
+                        text(f"ALTER TABLE {table_name} ADD COLUMN {name} {definition}")
+                    )
+                # Indices sobre as colunas novas nao sao criados pelo create_all em tabela existente.
+                for index in Base.metadata.tables[table_name].indexes:
+                    index.create(connection, checkfirst=True)
 
     def get_session(self):
         session = self.SessionLocal()
@@ -46,5 +117,13 @@ class DbClient:
         finally:
             session.close()
 
+    async def get_async_session(self):
+        async with self.AsyncSessionLocal() as session:
+            yield session
+
+    async def dispose(self):
+        await self.async_engine.dispose()
+        self.engine.dispose()
+
 
 db_client = DbClient()
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, Time
 from sqlalchemy.ext.declarative import declarative_base
 from app.core.logger import get_logger
 
@@ -25,5 +25,42 @@ class MessageRequest(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     published_messages = Column(Integer, nullable=False)
     send_messages = Column(Integer, nullable=False)
+    parsed_rows = Column(Integer, nullable=False, default=0)
+    rejected_rows = Column(Integer, nullable=False, default=0)
+    # Destinatarios que foram para o backup (falha permanente ou retries esgotados).
+    failed_messages = Column(Integer, nullable=False, default=0)
     status = Column(String, nullable=False)
     template_type = Column(String, nullable=False)
+    error = Column(String, nullable=True)
+    # Despacho ritmado (campaign_dispatcher): inicio em UTC, janela diaria no horario de
+    # DISPATCH_TIMEZONE e limite de mensagens por minuto. Todos nulos = envio imediato.
+    scheduled_at = Column(DateTime, nullable=True)
+    send_window_start = Column(Time, nullable=True)
+    send_window_end = Column(Time, nullable=True)
+    messages_per_minute = Column(Integer, nullable=True)
+
+
+class MessageRecipient(Base):
+    __tablename__ = "message_recipients"
+    __table_args__ = (
+        Index("ux_message_recipients_request_row", "message_request_id", "row_index", unique=True),
+        Index("ix_message_recipients_request_status", "message_request_id", "status"),
+        Index("ix_message_recipients_idempotency_key", "idempotency_key"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    message_request_id = Column(Integer, ForeignKey("message_requests.id"), nullable=False)
+    row_index = Column(Integer, nullable=False)
+    whatsapp_number = Column(String, nullable=False)
+    # Parametros do template, para o dispatcher montar o payload sem reler a planilha.
+    name = Column(String, nullable=True)
+    month_folha_ponto = Column(String, nullable=True)
+    # "<message_request_id>:<numero normalizado>"; mesmo valor enviado no payload da fila.
+    idempotency_key = Column(String, nullable=True)
+    status = Column(String, nullable=False)
+    # Reserva do dispatcher ("claimed"): linhas presas alem do prazo voltam para "pending".
+    claimed_at = Column(DateTime, nullable=True)
+    meta_message_id = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
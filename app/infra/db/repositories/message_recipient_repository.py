@@ -0,0 +1,216 @@
+from collections.abc import Mapping, Sequence
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_, bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.infra.db.models import MessageRecipient
+
+logger = get_logger(__name__)
+
+RECIPIENT_COPY_COLUMNS = (
+    "message_request_id",
+    "row_index",
+    "whatsapp_number",
+    "idempotency_key",
+    "name",
+    "month_folha_ponto",
+    "status",
+    "error",
+    "created_at",
+    "updated_at",
+)
+
+# Linhas que nao foram publicadas e entram no relatorio de rejeitados.
+REJECTED_STATUSES = ("rejected", "duplicate")
+# Linhas que o dispatcher ainda publica; "released" voltou de uma reserva sem publish confirmado.
+CLAIMABLE_STATUSES = ("pending", "released")
+
+
+class MessageRecipientRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def bulk_insert(
+        self,
+        message_request_id: int,
+        recipients: Sequence[Mapping[str, Any]],
+    ) -> None:
+        # Cada destinatario: row_index, whatsapp_number, idempotency_key, name, month_folha_ponto,
+        # status e error (opcionais: idempotency_key, name, month_folha_ponto e error).
+        if not recipients:
+            return
+        now = datetime.utcnow()
+        records = [
+            (
+                message_request_id,
+                recipient["row_index"],
+                recipient["whatsapp_number"],
+                recipient.get("idempotency_key"),
+                recipient.get("name"),
+                recipient.get("month_folha_ponto"),
+                recipient["status"],
+                recipient.get("error"),
+                now,
+                now,
+            )
+            for recipient in recipients
+        ]
+
+        connection = await self.session.connection()
+        if connection.dialect.driver == "asyncpg":
+            # COPY na mesma transacao da sessao: um unico comando para o bloco inteiro.
+            # O dialeto asyncpg so emite o BEGIN no primeiro comando; sem nenhum comando
+            # antes, o COPY pela conexao crua rodaria em autocommit, fora da transacao.
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            if not driver_connection.is_in_transaction():
+                await connection.exec_driver_sql("SELECT 1")
+            await driver_connection.copy_records_to_table(
+                MessageRecipient.__tablename__,
+                records=records,
+                columns=RECIPIENT_COPY_COLUMNS,
+            )
+            return
+
+        await self.session.execute(
+            insert(MessageRecipient),
+            [dict(zip(RECIPIENT_COPY_COLUMNS, record)) for record in records],
+        )
+
+    async def list_sent_keys(self, idempotency_keys: list[str]) -> set[str]:
+        # Uma consulta por mensagem/envelope: quais dessas chaves ja tem envio gravado.
+        if not idempotency_keys:
+            return set()
+        result = await self.session.execute(
+            select(MessageRecipient.idempotency_key).where(
+                MessageRecipient.idempotency_key.in_(idempotency_keys),
+                MessageRecipient.status == "sent",
+            )
+        )
+        return set(result.scalars().all())
+
+    async def list_rejected(self, message_request_id: int) -> list[MessageRecipient]:
+        result = await self.session.execute(
+            select(MessageRecipient)
+            .where(
+                MessageRecipient.message_request_id == message_request_id,
+                MessageRecipient.status.in_(REJECTED_STATUSES),
+            )
+            .order_by(MessageRecipient.row_index)
+        )
+        return list(result.scalars())
+
+    async def update_outcomes(self, outcomes: Sequence[Mapping[str, Any]]) -> None:
+        # executemany: o driver envia o lote inteiro de uma vez, sem uma ida ao banco por linha.
+        if not outcomes:
+            return
+        table = MessageRecipient.__table__
+        statement = (
+            update(table)
+            .where(
+                and_(
+                    table.c.message_request_id == bindparam("b_message_request_id"),
+                    table.c.row_index == bindparam("b_row_index"),
+                )
+            )
+            .values(
+                status=bindparam("b_status"),
+                meta_message_id=bindparam("b_meta_message_id"),
+                error=bindparam("b_error"),
+                updated_at=bindparam("b_updated_at"),
+            )
+        )
+        await self.session.execute(
+            statement,
+            [{f"b_{key}": value for key, value in outcome.items()} for outcome in outcomes],
+        )
+
+    async def claim_pending(self, message_request_id: int, limit: int) -> list[dict[str, Any]]:
+        # Reserva ("claimed", com claimed_at) os proximos pendentes (ordem da planilha) e
+        # devolve os campos do payload. No Postgres, SKIP LOCKED impede que dois
+        # dispatchers peguem a mesma linha. "republished" marca as linhas "released", que
+        # podem ja ter uma mensagem na fila.
+        table = MessageRecipient.__table__
+        now = datetime.utcnow()
+        claimable = await self.session.execute(
+            select(table.c.id, table.c.status)
+            .where(
+                table.c.message_request_id == message_request_id,
+                table.c.status.in_(CLAIMABLE_STATUSES),
+            )
+            .order_by(table.c.row_index)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statuses = dict(claimable.all())
+        if not statuses:
+            return []
+        result = await self.session.execute(
+            update(table)
+            .where(table.c.id.in_(list(statuses)))
+            .values(status="claimed", claimed_at=now, updated_at=now)
+            .returning(
+                table.c.id,
+                table.c.row_index,
+                table.c.whatsapp_number,
+                table.c.idempotency_key,
+                table.c.name,
+                table.c.month_folha_ponto,
+            )
+        )
+        claimed = []
+        for row in result:
+            recipient = dict(row._mapping)
+            recipient["republished"] = statuses[recipient.pop("id")] == "released"
+            claimed.append(recipient)
+        return sorted(claimed, key=lambda row: row["row_index"])
+
+    async def mark_queued(self, message_request_id: int, row_indexes: Sequence[int]) -> None:
+        # Publish confirmado: reservas viram "queued". Linhas que o worker ja atualizou
+        # (sent/retrying/failed) ficam como estao.
+        await self._update_claimed(message_request_id, row_indexes, "queued")
+
+    async def release_claimed(self, message_request_id: int, row_indexes: Sequence[int]) -> None:
+        # Publish falhou: as linhas voltam como "released" e entram no proximo ciclo do
+        # dispatcher; parte delas pode ter sido confirmada pelo broker antes da falha.
+        await self._update_claimed(message_request_id, row_indexes, "released")
+
+    async def _update_claimed(self, message_request_id: int, row_indexes: Sequence[int], status: str) -> None:
+        if not row_indexes:
+            return
+        await self.session.execute(
+            update(MessageRecipient)
+            .where(
+                MessageRecipient.message_request_id == message_request_id,
+                MessageRecipient.row_index.in_(list(row_indexes)),
+                MessageRecipient.status == "claimed",
+            )
+            .values(status=status, claimed_at=None, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def release_stale_claims(self, claimed_before: datetime) -> int:
+        # Reservas de um ciclo que nao terminou (crash do dispatcher, falha no commit apos
+        # o publish) voltam como "released"; se a mensagem chegou a fila, a idempotencia
+        # do worker evita o segundo envio.
+        result = await self.session.execute(
+            update(MessageRecipient)
+            .where(MessageRecipient.status == "claimed", MessageRecipient.claimed_at < claimed_before)
+            .values(status="released", claimed_at=None, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    async def has_claimed(self, message_request_id: int) -> bool:
+        result = await self.session.execute(
+            select(MessageRecipient.id)
+            .where(
+                MessageRecipient.message_request_id == message_request_id,
+                MessageRecipient.status == "claimed",
+            )
+            .limit(1)
+        )
+        return result.first() is not None
@@ -0,0 +1,145 @@
+from collections.abc import Iterable, Mapping
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import bindparam, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.core.settings import settings
+from app.infra.db.models import MessageRequest
+
+logger = get_logger(__name__)
+
+# Campanhas ritmadas aguardando o dispatcher: antes do primeiro envio e durante o despacho.
+DISPATCH_STATUSES = ("scheduled", "dispatching")
+
+# Campos do progresso de uma campanha (rota SSE e NOTIFY).
+PROGRESS_COLUMNS = (
+    "id",
+    "status",
+    "parsed_rows",
+    "rejected_rows",
+    "published_messages",
+    "send_messages",
+    "failed_messages",
+    "error",
+)
+
+# O payload do NOTIFY e montado no banco com o estado da linha; o erro e truncado
+# porque o Postgres limita o payload a 8000 bytes.
+PROGRESS_NOTIFY_SQL = text(
+    """
+    SELECT pg_notify(:channel, json_build_object(
+        'id', id,
+        'status', status,
+        'parsed_rows', parsed_rows,
+        'rejected_rows', rejected_rows,
+        'published_messages', published_messages,
+        'send_messages', send_messages,
+        'failed_messages', failed_messages,
+        'error', left(error, 1000)
+    )::text)
+    FROM message_requests
+    WHERE id = ANY(:ids)
+    """
+)
+
+
+class MessageRequestRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def increment_send_messages(self, increments: Mapping[int, int]) -> None:
+        await self._increment("send_messages", increments)
+
+    async def increment_failed_messages(self, increments: Mapping[int, int]) -> None:
+        await self._increment("failed_messages", increments)
+
+    async def increment_published_messages(self, increments: Mapping[int, int]) -> None:
+        await self._increment("published_messages", increments)
+
+    async def _increment(self, column_name: str, increments: Mapping[int, int]) -> None:
+        # Um unico executemany com incremento atomico no banco, seguro entre varios workers.
+        if not increments:
+            return
+        table = MessageRequest.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("request_id"))
+            .values({column_name: table.c[column_name] + bindparam("amount")})
+        )
+        await self.session.execute(
+            statement,
+            [{"request_id": request_id, "amount": amount} for request_id, amount in increments.items()],
+        )
+
+    async def finish_completed(self, request_ids: Iterable[int]) -> list[int]:
+        # So finaliza depois da ingestao (status "requested") e quando todas as publicadas tem
+        # resultado final: enviadas ou no backup (falha permanente ou retries esgotados).
+        ids = list(request_ids)
+        if not ids:
+            return []
+        result = await self.session.execute(
+            update(MessageRequest)
+            .where(
+                MessageRequest.id.in_(ids),
+                MessageRequest.status == "requested",
+                MessageRequest.published_messages > 0,
+                MessageRequest.send_messages + MessageRequest.failed_messages >= MessageRequest.published_messages,
+            )
+            .values(status="finish")
+            .returning(MessageRequest.id)
+            .execution_options(synchronize_session=False)
+        )
+        return [row[0] for row in result]
+
+    async def fail_parsing(self, error: str) -> list[int]:
+        # Jobs que ficaram em "parsing" sem processo rodando (API encerrada no meio da ingestao).
+        result = await self.session.execute(
+            update(MessageRequest)
+            .where(MessageRequest.status == "parsing")
+            .values(status="failed", error=error)
+            .returning(MessageRequest.id)
+            .execution_options(synchronize_session=False)
+        )
+        return [row[0] for row in result]
+
+    async def list_dispatchable(self, now: datetime) -> list[MessageRequest]:
+        # Campanhas ritmadas com inicio ja alcancado; a janela diaria e checada no dispatcher.
+        result = await self.session.execute(
+            select(MessageRequest)
+            .where(
+                MessageRequest.status.in_(DISPATCH_STATUSES),
+                or_(MessageRequest.scheduled_at.is_(None), MessageRequest.scheduled_at <= now),
+            )
+            .order_by(MessageRequest.id)
+        )
+        return list(result.scalars())
+
+    async def update_dispatch_status(self, request_id: int, status: str) -> bool:
+        # So altera campanhas ainda em despacho (nao sobrescreve "failed" ou "finish").
+        result = await self.session.execute(
+            update(MessageRequest)
+            .where(MessageRequest.id == request_id, MessageRequest.status.in_(DISPATCH_STATUSES))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def list_progress(self, request_ids: Iterable[int]) -> list[dict[str, Any]]:
+        ids = list(request_ids)
+        if not ids:
+            return []
+        columns = [getattr(MessageRequest, name) for name in PROGRESS_COLUMNS]
+        result = await self.session.execute(select(*columns).where(MessageRequest.id.in_(ids)))
+        return [dict(row._mapping) for row in result]
+
+    async def notify_progress(self, request_ids: Iterable[int]) -> None:
+        # NOTIFY transacional: o hub de progresso da API so recebe no commit, com o estado
+        # ja gravado. Fora do Postgres nao ha LISTEN e o hub consulta o banco.
+        ids = list(request_ids)
+        if not ids or self.session.bind.dialect.name != "postgresql":
+            return
+        await self.session.flush()
+        await self.session.execute(PROGRESS_NOTIFY_SQL, {"channel": settings.PROGRESS_NOTIFY_CHANNEL, "ids": ids})
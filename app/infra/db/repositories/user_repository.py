@@ -1,16 +1,24 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.logger import get_logger
 from app.infra.db.models import User
 
 logger = get_logger(__name__)
 
 class UserRepository:
-    def __init__(self, session: Session): # Ele recebe uma sessão pronta
+    def __init__(self, session: AsyncSession): # Ele recebe uma sessão pronta
         self.session = session
 
-    def get_all(self):
-        return self.session.query(User).all()
+    async def get_all(self):
+        result = await self.session.execute(select(User))
+        return list(result.scalars())
     
-    def get_user_by_name(self, name: str):
-        return self.session.query(User).filter(User.name == name).first()
+    async def get_user_by_name(self, name: str):
+        result = await self.session.execute(select(User).where(User.name == name).limit(1))
+        return result.scalars().first()
+
+    async def update_password(self, user_id: int, password_hash: str) -> None:
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(password=password_hash)
+        )
     
@@ -0,0 +1,71 @@
+import json
+from typing import Any
+
+from app.core.logger import get_logger
+
+# orjson e dependencia do projeto, mas sem ele o JSON cai no stdlib; msgpack e opcional.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = get_logger(__name__)
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+
+class JsonCodec:
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, payload: Any) -> bytes:
+        return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def decode(self, body: bytes) -> Any:
+        return json.loads(body)
+
+
+class OrjsonCodec:
+    # Mesmo formato JSON do stdlib (mesmo content_type), serializado em C.
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, payload: Any) -> bytes:
+        return orjson.dumps(payload)
+
+    def decode(self, body: bytes) -> Any:
+        return orjson.loads(body)
+
+
+class MsgpackCodec:
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def encode(self, payload: Any) -> bytes:
+        return msgpack.packb(payload, use_bin_type=True)
+
+    def decode(self, body: bytes) -> Any:
+        return msgpack.unpackb(body, raw=False)
+
+
+# Codec por content_type; JSON usa orjson quando instalado.
+CODECS: dict[str, JsonCodec | OrjsonCodec | MsgpackCodec] = {
+    JSON_CONTENT_TYPE: OrjsonCodec() if orjson is not None else JsonCodec(),
+}
+if msgpack is not None:
+    CODECS[MSGPACK_CONTENT_TYPE] = MsgpackCodec()
+
+
+def get_codec(content_type: str | None) -> JsonCodec | OrjsonCodec | MsgpackCodec:
+    # Mensagens sem content_type (publicadas antes dos codecs) sao JSON.
+    codec = CODECS.get(content_type or JSON_CONTENT_TYPE)
+    if codec is None:
+        raise ValueError(f"content_type sem codec disponivel: {content_type}")
+    return codec
+
+
+def decode_body(body: bytes, content_type: str | None = None) -> Any:
+    return get_codec(content_type).decode(body)
@@ -1,15 +1,29 @@
-import json
+import asyncio
+import time
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any
+
 import aio_pika
 from app.core.logger import get_logger
+from app.core.metrics import RABBITMQ_CONFIRM_SECONDS, RABBITMQ_PUBLISHED
 from app.core.settings import settings
+from app.infra.rabbitmq.codecs import get_codec
 
 logger = get_logger(__name__)
 
+# Chave do envelope com varios destinatarios em uma unica mensagem AMQP.
+BATCH_ENVELOPE_KEY = "batch"
+
 class RabbitMQ:
     def __init__(self):
         self.connection = None
         self.channel = None
         self.exchange = None
+        self.codec = get_codec(settings.RABBITMQ_CONTENT_TYPE)
+        # Filas ja declaradas/vinculadas nesta conexao; evita redeclarar a cada publish.
+        # Zerado quando a conexao e recriada ou reconecta (broker reiniciado, fila apagada).
+        self._declared_queues: set[str] = set()
 
     async def connect(self):
         if not self.connection or self.connection.is_closed:
@@ -17,24 +31,125 @@ class RabbitMQ:
                 raise ValueError(
                     "RABBITMQ_URL invalida para AMQP. Use amqp:// ou amqps:// (nao use http/https)."
                 )
+            self._declared_queues.clear()
             self.connection = await aio_pika.connect_robust(settings.RABBITMQ_URL)
-            self.channel = await self.connection.channel()
+            self.connection.reconnect_callbacks.add(self._on_reconnect)
+            self.channel = await self.connection.channel(publisher_confirms=True)
             self.exchange = await self.channel.declare_exchange(
                 settings.RABBITMQ_EXCHANGE, aio_pika.ExchangeType.DIRECT, durable=True
             )
 
-    async def ensure_queue(self, queue_name: str):
+    async def close(self):
+        if self.connection and not self.connection.is_closed:
+            await self.connection.close()
+        self.connection = None
+        self.channel = None
+        self.exchange = None
+        self._declared_queues.clear()
+
+    def _on_reconnect(self, _connection) -> None:
+        self._declared_queues.clear()
+
+    async def ensure_queue(self, queue_name: str, arguments: dict[str, Any] | None = None):
         await self.connect()
-        queue = await self.channel.declare_queue(queue_name, durable=True)
+        if queue_name in self._declared_queues:
+            return
+        queue = await self.channel.declare_queue(queue_name, durable=True, arguments=arguments)
         await queue.bind(self.exchange, routing_key=queue_name)
+        self._declared_queues.add(queue_name)
+
+    async def queue_message_count(self, queue_name: str) -> int:
+        # Declare passivo: so le as mensagens prontas (sem as em processamento/unacked).
+        await self.ensure_queue(queue_name)
+        queue = await self.channel.declare_queue(queue_name, passive=True)
+        return queue.declaration_result.message_count
+
+    async def ensure_delay_queue(self, target_queue: str, delay_seconds: int) -> str:
+        # Fila sem consumidor: a mensagem expira apos o TTL e volta (dead-letter) para a fila alvo.
+        delay_queue = f"{target_queue}.retry.{delay_seconds}s"
+        await self.ensure_queue(
+            delay_queue,
+            arguments={
+                "x-message-ttl": delay_seconds * 1000,
+                "x-dead-letter-exchange": settings.RABBITMQ_EXCHANGE,
+                "x-dead-letter-routing-key": target_queue,
+            },
+        )
+        return delay_queue
 
-    async def publish(self, queue_name: str, payload: dict):
+    async def publish(self, queue_name: str, payload: dict, headers: dict[str, Any] | None = None):
         await self.ensure_queue(queue_name)
-        await self.exchange.publish(
-            aio_pika.Message(
-                body=json.dumps(payload).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                content_type="application/json",
-            ),
-            routing_key=queue_name,
+        await self._publish_confirmed(
+            self._build_message(payload, headers), queue_name, RABBITMQ_CONFIRM_SECONDS.labels(queue_name)
+        )
+        RABBITMQ_PUBLISHED.labels(queue_name).inc()
+
+    async def publish_many(
+        self,
+        queue_name: str,
+        payloads: Iterable[dict[str, Any]],
+        window: int | None = None,
+        batch_size: int | None = None,
+    ) -> int:
+        # Publica em janelas sem esperar cada confirmacao individualmente; retorna
+        # somente depois que o broker confirmou (publisher confirm) todas as mensagens.
+        # Com batch_size > 1, cada mensagem AMQP leva um envelope com ate batch_size payloads.
+        # O retorno e sempre a quantidade de payloads (destinatarios) publicados.
+        await self.ensure_queue(queue_name)
+        window_size = window or settings.RABBITMQ_PUBLISH_WINDOW
+        confirm_seconds = RABBITMQ_CONFIRM_SECONDS.labels(queue_name)
+        published_messages = RABBITMQ_PUBLISHED.labels(queue_name)
+        published = 0
+        pending = []
+        pending_payloads = 0
+        envelopes = self._envelopes(payloads, batch_size or settings.RABBITMQ_PUBLISH_BATCH_SIZE)
+
+        for body, payload_count in envelopes:
+            pending.append(
+                self._publish_confirmed(self._build_message(body), queue_name, confirm_seconds)
+            )
+            pending_payloads += payload_count
+            if len(pending) >= window_size:
+                await asyncio.gather(*pending)
+                published_messages.inc(len(pending))
+                published += pending_payloads
+                pending = []
+                pending_payloads = 0
+
+        if pending:
+            await asyncio.gather(*pending)
+            published_messages.inc(len(pending))
+            published += pending_payloads
+
+        return published
+
+    async def _publish_confirmed(self, message: aio_pika.Message, queue_name: str, confirm_seconds) -> None:
+        # Com publisher confirms, o publish so retorna apos o ack do broker.
+        started = time.perf_counter()
+        await self.exchange.publish(message, routing_key=queue_name)
+        confirm_seconds.observe(time.perf_counter() - started)
+
+    def _envelopes(
+        self,
+        payloads: Iterable[dict[str, Any]],
+        batch_size: int,
+    ) -> Iterator[tuple[dict[str, Any], int]]:
+        iterator = iter(payloads)
+        if batch_size <= 1:
+            for payload in iterator:
+                yield payload, 1
+            return
+        while batch := list(islice(iterator, batch_size)):
+            yield {BATCH_ENVELOPE_KEY: batch}, len(batch)
+
+    def _build_message(
+        self,
+        payload: dict[str, Any],
+        headers: dict[str, Any] | None = None,
+    ) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=self.codec.encode(payload),
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            content_type=self.codec.content_type,
+            headers=headers,
         )
@@ -1,8 +1,14 @@
 from fastapi import FastAPI
 from app.api.v1.routes import router as v1_router
 from app.core.logger import get_logger, setup_logging
+from app.core.metrics import MetricsMiddleware, metrics_response
 from app.core.settings import settings
 from app.infra.db.db_client import db_client
+from app.services.folha_ponto_ativos_service import FolhaPontoAtivosService
+from app.services.ingestion_executor import ingestion_executor
+from app.services.password_hashing_executor import password_hasher
+from app.services.progress_hub import progress_hub
+from app.utils.parse_pool import parse_pool
 from fastapi.middleware.cors import CORSMiddleware
 
 setup_logging()
@@ -25,10 +31,28 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     db_client.create_tables()
+    if settings.INGESTION_RECOVER_ON_STARTUP:
+        await FolhaPontoAtivosService.recover_interrupted_jobs()
+    parse_pool.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await ingestion_executor.shutdown()
+    await password_hasher.shutdown()
+    await progress_hub.close()
+    parse_pool.shutdown()
+    await db_client.dispose()
 
 
 app.include_router(v1_router, prefix="/api/v1")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
@@ -1,8 +1,10 @@
 from fastapi import HTTPException, status
 
 from app.core.logger import get_logger
-from app.core.security import verify_password
+from app.core.security import invalidate_user_cache
+from app.infra.db.db_client import db_client
 from app.infra.db.repositories.user_repository import UserRepository
+from app.services.password_hashing_executor import password_hasher
 
 logger = get_logger(__name__)
 
@@ -11,11 +13,27 @@ class AuthService:
     def __init__(self, user_repo: UserRepository):
         self.user_repo = user_repo
 
-    def authenticate(self, name: str, password: str):
-        user = self.user_repo.get_user_by_name(name)
-        if not user or not verify_password(password, user.password):
+    async def authenticate(self, name: str, password: str):
+        user = await self.user_repo.get_user_by_name(name)
+        if not user or not await password_hasher.verify(password, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Credenciais invalidas",
             )
+        if password_hasher.needs_update(user.password):
+            # O login responde com uma unica verificacao; o novo hash e gravado depois.
+            password_hasher.rehash_in_background(
+                password,
+                lambda new_hash: self.save_rehashed_password(user.id, new_hash),
+                name=f"rehash-user-{user.id}",
+            )
         return user
+
+    @staticmethod
+    async def save_rehashed_password(user_id: int, password_hash: str) -> None:
+        # Roda apos a resposta do login, entao usa sessao propria.
+        async with db_client.AsyncSessionLocal() as session:
+            await UserRepository(session).update_password(user_id, password_hash)
+            await session.commit()
+        invalidate_user_cache(user_id)
+        logger.info("Hash de senha atualizado para o esquema padrao. user_id=%s", user_id)
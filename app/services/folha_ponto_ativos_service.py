@@ -1,64 +1,238 @@
-from sqlalchemy.orm import Session
+import asyncio
+from datetime import datetime, time
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger import get_logger
 from app.core.settings import settings
+from app.infra.db.db_client import db_client
 from app.infra.db.models import MessageRequest
+from app.infra.db.repositories.message_recipient_repository import MessageRecipientRepository
+from app.infra.db.repositories.message_request_repository import MessageRequestRepository
 from app.infra.rabbitmq.rabbitmq_client import RabbitMQ
-from app.utils.file_utils import xlsx_to_dataframe
+from app.services.ingestion_executor import ingestion_executor
+from app.utils.file_utils import SUPPORTED_UPLOAD_SUFFIXES, save_upload_file
+from app.utils.parse_pool import parse_pool
+from app.utils.payload_utils import build_folha_ponto_payloads, split_valid_payloads
+from app.utils.schedule_utils import is_paced, to_utc_naive, validate_campaign_schedule
 
 logger = get_logger(__name__)
 
+INGESTION_INTERRUPTED_ERROR = "Ingestao interrompida pelo encerramento da API; envie a planilha novamente"
+
 
 class FolhaPontoAtivosService:
-    # Ao criar o objeto 
-    def __init__(self, session: Session):
+    # Ao criar o objeto
+    def __init__(self, session: AsyncSession):
         self.session = session
         self.rabbitmq_client = RabbitMQ()
 
-    async def loop_folha_ponto_ativos(
+    async def create_ingestion_job(
         self,
-        file,
+        file: UploadFile,
         column_name: str,
         column_month: str,
         column_contact: str,
         user_id: int,
         template_type: str,
+        scheduled_at: datetime | None = None,
+        send_window_start: time | None = None,
+        send_window_end: time | None = None,
+        messages_per_minute: int | None = None,
     ):
-        request = MessageRequest(
-            user_id=user_id,
-            published_messages=0,
-            send_messages=0,
-            status="requested",
-            template_type=template_type,
+        validate_campaign_schedule(send_window_start, send_window_end, messages_per_minute)
+        # Admissao antes de copiar o upload: requests recusados nao gravam o arquivo em
+        # disco. Uploads simultaneos que passarem juntos pela checagem podem exceder a
+        # fila em no maximo o numero de uploads em andamento.
+        if ingestion_executor.is_saturated():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Processamento de planilhas saturado; tente novamente em instantes",
+                headers={"Retry-After": "30"},
+            )
+        file_path = await save_upload_file(file, SUPPORTED_UPLOAD_SUFFIXES)
+
+        try:
+            request = MessageRequest(
+                user_id=user_id,
+                published_messages=0,
+                send_messages=0,
+                parsed_rows=0,
+                rejected_rows=0,
+                status="parsing",
+                template_type=template_type,
+                scheduled_at=to_utc_naive(scheduled_at),
+                send_window_start=send_window_start,
+                send_window_end=send_window_end,
+                messages_per_minute=messages_per_minute,
+            )
+            self.session.add(request)
+            await self.session.commit()
+            await self.session.refresh(request)
+        except BaseException:
+            # Ate o submit o arquivo e da request; depois, o job o remove ao terminar.
+            file_path.unlink(missing_ok=True)
+            raise
+
+        ingestion_executor.submit(
+            self.run_ingestion_job(
+                message_request_id=request.id,
+                file_path=file_path,
+                column_name=column_name,
+                column_month=column_month,
+                column_contact=column_contact,
+                user_id=user_id,
+                template_type=template_type,
+            ),
+            name=f"ingestion-{request.id}",
         )
-        self.session.add(request)
-        self.session.commit()
-        self.session.refresh(request)
-
-        df = await xlsx_to_dataframe(file)
-        published = 0
-
-        for _, row in df.iterrows():
-            payload = {
-                "name": str(row[column_name]),
-                "month_folha_ponto": str(row[column_month]),
-                "whatsapp_number": str(row[column_contact]),
-                "user_id": user_id,
-                "template_type": template_type,
-                "message_request_id": request.id,
-            }
-            await self.rabbitmq_client.publish(settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS, payload)
-            published += 1
-
-        request.published_messages = published
-        request.status = "requested"
-        self.session.commit()
-        self.session.refresh(request)
 
         return {
             "message_request_id": request.id,
-            "published_messages": request.published_messages,
             "status": request.status,
             "template_type": request.template_type,
             "created_at": request.created_at,
         }
+
+    @classmethod
+    async def run_ingestion_job(
+        cls,
+        message_request_id: int,
+        file_path: Path,
+        column_name: str,
+        column_month: str,
+        column_contact: str,
+        user_id: int,
+        template_type: str,
+    ) -> None:
+        # O job roda depois da resposta HTTP, entao usa sessao e conexao proprias.
+        async with db_client.AsyncSessionLocal() as session:
+            service = cls(session=session)
+            try:
+                await service.loop_folha_ponto_ativos(
+                    message_request_id=message_request_id,
+                    file=file_path,
+                    column_name=column_name,
+                    column_month=column_month,
+                    column_contact=column_contact,
+                    user_id=user_id,
+                    template_type=template_type,
+                )
+            except asyncio.CancelledError:
+                # Encerramento da API (ingestion_executor.shutdown): o job nao e retomado e o
+                # upload e removido, entao a campanha vai para "failed" em vez de ficar em "parsing".
+                try:
+                    await session.rollback()
+                    await service.mark_failed(message_request_id, INGESTION_INTERRUPTED_ERROR)
+                except Exception:
+                    logger.exception("Falha ao marcar ingestao interrompida. message_request_id=%s", message_request_id)
+                raise
+            except Exception as exc:
+                await session.rollback()
+                await service.mark_failed(message_request_id, str(getattr(exc, "detail", None) or exc))
+                raise
+            finally:
+                await service.rabbitmq_client.close()
+                file_path.unlink(missing_ok=True)
+
+    async def loop_folha_ponto_ativos(
+        self,
+        message_request_id: int,
+        file: Path,
+        column_name: str,
+        column_month: str,
+        column_contact: str,
+        user_id: int,
+        template_type: str,
+    ):
+        request = await self.session.get(MessageRequest, message_request_id)
+        if request is None:
+            raise ValueError(f"MessageRequest nao encontrado para id={message_request_id}")
+
+        # Chaves de idempotencia ja vistas neste job: numero repetido na planilha nao e publicado.
+        seen_keys: set[str] = set()
+        # Campanha ritmada: os validos ficam "pending" em message_recipients e o
+        # campaign_dispatcher publica no ritmo e na janela configurados.
+        paced = is_paced(request.scheduled_at, request.send_window_start, request.messages_per_minute)
+        valid_status = "pending" if paced else "queued"
+
+        # Publica conforme os blocos sao lidos, sem esperar o parse completo da planilha.
+        # O parse roda no pool de processos; o event loop so recebe os blocos prontos.
+        async for chunk in parse_pool.stream_rows(file, [column_name, column_month, column_contact]):
+            row_numbers, names, months, contacts = zip(*chunk)
+            payloads = build_folha_ponto_payloads(
+                names,
+                months,
+                contacts,
+                user_id=user_id,
+                template_type=template_type,
+                message_request_id=request.id,
+                row_indexes=row_numbers,
+            )
+            # Validacao antes do broker: numero invalido ou repetido fica so no relatorio de rejeitados.
+            payloads, recipients = split_valid_payloads(payloads, contacts, seen_keys, valid_status)
+            # Destinatarios gravados (COPY) antes do publish: o worker sempre encontra a linha
+            # para registrar o resultado do envio.
+            await MessageRecipientRepository(self.session).bulk_insert(request.id, recipients)
+            await self.session.commit()
+            published = 0
+            if not paced:
+                published = await self.rabbitmq_client.publish_many(
+                    settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS, payloads
+                )
+
+            # Progresso consultavel pela rota de status enquanto o parse continua.
+            request.parsed_rows += len(chunk)
+            request.rejected_rows += len(chunk) - len(payloads)
+            request.published_messages += published
+            await MessageRequestRepository(self.session).notify_progress([request.id])
+            await self.session.commit()
+
+        if paced:
+            request.status = "scheduled" if request.parsed_rows > request.rejected_rows else "finish"
+        else:
+            request.status = "requested" if request.published_messages > 0 else "finish"
+        await self.session.commit()
+        # O worker pode ter enviado tudo antes do fim da ingestao; nesse caso finaliza aqui.
+        repository = MessageRequestRepository(self.session)
+        await repository.finish_completed([request.id])
+        await repository.notify_progress([request.id])
+        await self.session.commit()
+        logger.info(
+            "Ingestao concluida. message_request_id=%s status=%s parsed_rows=%s rejected_rows=%s published_messages=%s",
+            request.id,
+            request.status,
+            request.parsed_rows,
+            request.rejected_rows,
+            request.published_messages,
+        )
+
+    async def mark_failed(self, message_request_id: int, error: str) -> None:
+        request = await self.session.get(MessageRequest, message_request_id)
+        if request is None:
+            return
+        request.status = "failed"
+        request.error = error
+        await MessageRequestRepository(self.session).notify_progress([request.id])
+        await self.session.commit()
+
+    @classmethod
+    async def recover_interrupted_jobs(cls) -> None:
+        # Subida da API: nenhum job deste processo esta rodando. Jobs em "parsing" foram
+        # interrompidos (encerramento sem o cancelamento gracioso ou job ainda na fila) e
+        # nao podem ser retomados; os uploads que sobraram no disco nao tem mais dono.
+        async with db_client.AsyncSessionLocal() as session:
+            repository = MessageRequestRepository(session)
+            failed_ids = await repository.fail_parsing(INGESTION_INTERRUPTED_ERROR)
+            await repository.notify_progress(failed_ids)
+            await session.commit()
+        if failed_ids:
+            logger.warning("Ingestoes interrompidas marcadas como failed: %s", failed_ids)
+
+        upload_dir = Path(settings.UPLOAD_DIR)
+        if upload_dir.is_dir():
+            for leftover in upload_dir.iterdir():
+                if leftover.is_file():
+                    leftover.unlink(missing_ok=True)
@@ -0,0 +1,53 @@
+import asyncio
+from collections.abc import Coroutine
+from typing import Any
+
+from app.core.logger import get_logger
+from app.core.settings import settings
+
+logger = get_logger(__name__)
+
+
+class IngestionExecutor:
+    # Executa jobs de ingestao (parse + publish) em background, fora do ciclo da request HTTP,
+    # limitando quantos rodam ao mesmo tempo e quantos podem aguardar na fila do processo.
+    def __init__(self, max_concurrent_jobs: int, max_queued_jobs: int):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.max_queued_jobs = max_queued_jobs
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def is_saturated(self) -> bool:
+        return len(self._tasks) >= self.max_concurrent_jobs + self.max_queued_jobs
+
+    def submit(self, job: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        task = asyncio.create_task(self._run(job, name), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, job: Coroutine[Any, Any, Any], name: str) -> None:
+        try:
+            async with self._semaphore:
+                await job
+        except asyncio.CancelledError:
+            # Cancelado ainda na fila o job nunca comecou: fecha a corrotina; o status
+            # "parsing" e o upload ficam para a recuperacao na subida da API.
+            job.close()
+            logger.warning("Job de ingestao cancelado: %s", name)
+            raise
+        except Exception:
+            logger.exception("Falha no job de ingestao: %s", name)
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+ingestion_executor = IngestionExecutor(
+    max_concurrent_jobs=settings.INGESTION_MAX_CONCURRENT_JOBS,
+    max_queued_jobs=settings.INGESTION_MAX_QUEUED_JOBS,
+)
@@ -1,15 +1,115 @@
+import time
 from typing import Any
-import re
 
 import httpx
 
 from app.core.logger import get_logger
+from app.core.metrics import META_REQUEST_SECONDS
 from app.core.settings import settings
+from app.infra.rabbitmq.codecs import JSON_CONTENT_TYPE, get_codec
+from app.utils.cache import LRUCache
+from app.utils.phone_utils import normalize_whatsapp_number
+from app.utils.rate_limiter import AdaptiveRateLimiter
 
 logger = get_logger(__name__)
 
+# Codigos de erro da Meta Cloud API que indicam limite de taxa/throughput.
+META_THROTTLING_ERROR_CODES = {4, 80007, 130429, 131048, 131056}
+
+
+JSON_CODEC = get_codec(JSON_CONTENT_TYPE)
+
+_TO_PLACEHOLDER = "__to__"
+_COMPONENTS_PLACEHOLDER = "__components__"
+_BODY_PARAMETERS_PREFIX = b'[{"type":"body","parameters":['
+_BODY_PARAMETERS_SUFFIX = b"]}]"
+_TEXT_PARAMETER_PREFIX = b'{"type":"text","text":'
+
+
+class MetaThrottledError(httpx.HTTPStatusError):
+    pass
+
+
+class MetaTemplateSkeleton:
+    # Corpo da requisicao de um template serializado uma unica vez; por mensagem
+    # so o numero e os parametros de texto do body sao serializados e concatenados.
+    def __init__(self, template_name: str, language_code: str = "pt_BR"):
+        skeleton = JSON_CODEC.encode(
+            {
+                "messaging_product": "whatsapp",
+                "to": _TO_PLACEHOLDER,
+                "type": "template",
+                "template": {
+                    "name": template_name,
+                    "language": {"code": language_code},
+                    "components": _COMPONENTS_PLACEHOLDER,
+                },
+            }
+        )
+        self._head, rest = skeleton.split(JSON_CODEC.encode(_TO_PLACEHOLDER))
+        self._middle, self._tail = rest.split(JSON_CODEC.encode(_COMPONENTS_PLACEHOLDER))
+
+    def render(self, whatsapp_number: str, body_parameters: list[str]) -> bytes:
+        if body_parameters:
+            components = (
+                _BODY_PARAMETERS_PREFIX
+                + b",".join(
+                    _TEXT_PARAMETER_PREFIX + JSON_CODEC.encode(str(text)) + b"}"
+                    for text in body_parameters
+                )
+                + _BODY_PARAMETERS_SUFFIX
+            )
+        else:
+            components = b"[]"
+        return b"".join(
+            (
+                self._head,
+                b'"55',
+                whatsapp_number.encode(),
+                b'"',
+                self._middle,
+                components,
+                self._tail,
+            )
+        )
+
 
 class MetaRequestService:
+    def __init__(self, max_rate: float | None = None):
+        self._client: httpx.AsyncClient | None = None
+        self._skeletons = LRUCache(maxsize=128)
+        # Histograma de latencia por status ja resolvido (labels() custa mais que observe()).
+        self._latency_by_status: dict[str, Any] = {}
+        self.rate_limiter = AdaptiveRateLimiter(
+            # Com varios processos de worker, cada um recebe a sua fracao do limite global.
+            max_rate=max_rate or settings.META_RATE_LIMIT_PER_SECOND,
+            min_rate=settings.META_RATE_LIMIT_MIN_PER_SECOND,
+            burst=settings.META_RATE_LIMIT_BURST,
+            decrease_factor=settings.META_RATE_LIMIT_DECREASE_FACTOR,
+            increase_step=settings.META_RATE_LIMIT_INCREASE_STEP,
+            recovery_seconds=settings.META_RATE_LIMIT_RECOVERY_SECONDS,
+        )
+
+    async def start(self) -> None:
+        # Um unico client por processo: reaproveita conexoes TCP/TLS com a Meta (keep-alive)
+        # e, com META_HTTP2, multiplexa os envios concorrentes na mesma conexao.
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=settings.META_HTTP_TIMEOUT_SECONDS,
+            http2=settings.META_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.META_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.META_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.META_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def send_template_message(self, payload: dict[str, Any]) -> dict[str, Any]:
         if not settings.WHATSAPP_TOKEN:
             raise ValueError("Configuracao da Meta incompleta. Defina WHATSAPP_TOKEN.")
@@ -18,52 +118,82 @@ class MetaRequestService:
         template_name = payload.get("template_name") or payload.get("template_type")
         if not template_name:
             raise ValueError("Payload sem template_name/template_type.")
-        components = payload.get("components") or self._build_components(payload)
-
-        request_body = {
-            "messaging_product": "whatsapp",
-            "to": f"55{whatsapp_number}",
-            "type": "template",
-            "template": {
-                "name": template_name,
-                "language": {"code": "pt_BR"},
-                "components": components,
-            },
-        }
+
+        if "body_parameters" in payload:
+            content = self._template_skeleton(template_name).render(
+                whatsapp_number, payload["body_parameters"]
+            )
+        else:
+            components = payload.get("components") or self._build_components(payload)
+            content = JSON_CODEC.encode(
+                {
+                    "messaging_product": "whatsapp",
+                    "to": f"55{whatsapp_number}",
+                    "type": "template",
+                    "template": {
+                        "name": template_name,
+                        "language": {"code": "pt_BR"},
+                        "components": components,
+                    },
+                }
+            )
 
         headers = {
             "Authorization": f"Bearer {settings.WHATSAPP_TOKEN}",
-            "Content-Type": "application/json",
+            "Content-Type": JSON_CONTENT_TYPE,
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                settings.META_MESSAGES_URL, headers=headers, json=request_body
+        await self.start()
+        await self.rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = await self._client.post(
+                settings.META_MESSAGES_URL, headers=headers, content=content
+            )
+        except httpx.TransportError:
+            self._observe_latency("error", time.perf_counter() - started)
+            raise
+        self._observe_latency(str(response.status_code), time.perf_counter() - started)
+        if self._is_throttled(response):
+            self.rate_limiter.on_throttled()
+            raise MetaThrottledError(
+                f"Meta limitou a taxa de envio (HTTP {response.status_code}).",
+                request=response.request,
+                response=response,
             )
-            response.raise_for_status()
-            try:
-                return response.json()
-            except ValueError:
-                return {}
+        response.raise_for_status()
+        self.rate_limiter.on_success()
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    def _observe_latency(self, status: str, elapsed_seconds: float) -> None:
+        histogram = self._latency_by_status.get(status)
+        if histogram is None:
+            histogram = self._latency_by_status[status] = META_REQUEST_SECONDS.labels(status)
+        histogram.observe(elapsed_seconds)
+
+    def _is_throttled(self, response: httpx.Response) -> bool:
+        if response.status_code == 429:
+            return True
+        if response.is_success:
+            return False
+        try:
+            error = response.json().get("error") or {}
+        except (ValueError, AttributeError):
+            return False
+        return error.get("code") in META_THROTTLING_ERROR_CODES
+
+    def _template_skeleton(self, template_name: str) -> MetaTemplateSkeleton:
+        skeleton = self._skeletons.get(template_name)
+        if skeleton is None:
+            skeleton = MetaTemplateSkeleton(template_name)
+            self._skeletons.set(template_name, skeleton)
+        return skeleton
 
     def _normalize_whatsapp_number(self, value: Any) -> str:
-        raw_value = str(value).strip()
-        if not raw_value or raw_value.lower() == "nan":
-            raise ValueError("whatsapp_number invalido no payload.")
-
-        # Corrige numeros lidos do Excel como float, ex: 41998233073.0
-        if re.fullmatch(r"\d+\.0+", raw_value):
-            raw_value = raw_value.split(".", 1)[0]
-
-        digits = "".join(char for char in raw_value if char.isdigit())
-        if not digits:
-            raise ValueError("whatsapp_number invalido no payload.")
-
-        # Evita duplicar DDI no envio (request_body ja prefixa com 55)
-        if digits.startswith("55") and len(digits) > 11:
-            digits = digits[2:]
-
-        return digits
+        return normalize_whatsapp_number(value)
 
     def _build_components(self, payload: dict[str, Any]) -> list[dict[str, Any]]:
         # Mantem o formato generico: qualquer campo (exceto metadados)
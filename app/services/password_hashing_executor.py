@@ -0,0 +1,94 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from fastapi import HTTPException, status
+
+from app.core.logger import get_logger
+from app.core.security import get_password_hash, password_needs_update, verify_password
+from app.core.settings import settings
+
+logger = get_logger(__name__)
+
+
+class PasswordHashingExecutor:
+    # bcrypt custa centenas de ms de CPU por chamada: roda em threads proprias (o bcrypt
+    # libera o GIL), fora do threadpool compartilhado do Starlette, com limite de pendencias.
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._background_tasks: set[asyncio.Task] = set()
+
+    def is_saturated(self) -> bool:
+        return self._pending >= self.max_pending
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def needs_update(self, hashed_password: str) -> bool:
+        return password_needs_update(hashed_password)
+
+    def rehash_in_background(
+        self,
+        password: str,
+        on_rehashed: Callable[[str], Awaitable[None]],
+        name: str,
+    ) -> None:
+        # Atualizacao oportunista: sob saturacao (ou ja em andamento) fica para o proximo login.
+        if self.is_saturated() or any(task.get_name() == name for task in self._background_tasks):
+            return
+        task = asyncio.create_task(self._rehash(password, on_rehashed, name), name=name)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def shutdown(self) -> None:
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _rehash(
+        self,
+        password: str,
+        on_rehashed: Callable[[str], Awaitable[None]],
+        name: str,
+    ) -> None:
+        try:
+            new_hash = await self.hash(password)
+            await on_rehashed(new_hash)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Falha ao atualizar hash de senha: %s", name)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Admissao: sem await entre a checagem e o incremento, entao nao ha corrida no event loop.
+        if self.is_saturated():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servico de autenticacao saturado; tente novamente em instantes",
+                headers={"Retry-After": "1"},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hash"
+            )
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+
+password_hasher = PasswordHashingExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+import asyncpg
+import orjson
+from sqlalchemy import make_url
+
+from app.core.logger import get_logger
+from app.core.settings import settings
+from app.infra.db.db_client import db_client
+from app.infra.db.repositories.message_request_repository import MessageRequestRepository
+
+logger = get_logger(__name__)
+
+TERMINAL_STATUSES = frozenset({"finish", "failed"})
+_LISTEN_RETRY_SECONDS = 5.0
+
+
+def is_finished(progress: dict[str, Any]) -> bool:
+    # "finish" ja conta os destinatarios no backup (finish_completed).
+    return progress["status"] in TERMINAL_STATUSES
+
+
+class ProgressHub:
+    # Fan-out do progresso das campanhas no processo da API. Uma unica assinatura por
+    # processo (LISTEN no Postgres; fora dele, uma consulta por intervalo para todos os
+    # ids observados) alimenta todos os clientes SSE, sem consulta por cliente. Taxa e ETA
+    # sao calculados aqui uma vez por atualizacao. Cada cliente guarda so o snapshot mais
+    # recente: um cliente lento pula estados intermediarios em vez de acumular fila.
+    def __init__(self, channel: str, rate_window_seconds: float, poll_interval_seconds: float):
+        self.channel = channel
+        self.rate_window_seconds = rate_window_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._latest: dict[int, dict[str, Any]] = {}
+        self._samples: dict[int, deque[tuple[float, int]]] = {}
+        self._task: asyncio.Task | None = None
+
+    async def updates(
+        self,
+        message_request_id: int,
+        keepalive_seconds: float,
+    ) -> AsyncIterator[dict[str, Any] | None]:
+        # Gera cada novo snapshot da campanha; None quando passa keepalive_seconds sem
+        # atualizacao (o endpoint envia um comentario SSE).
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        first_subscriber = message_request_id not in self._subscribers
+        self._subscribers.setdefault(message_request_id, set()).add(queue)
+        self._ensure_running()
+        if first_subscriber:
+            # Cobre uma atualizacao entre o snapshot inicial e a inscricao.
+            await self._refresh([message_request_id])
+        elif message_request_id in self._latest:
+            queue.put_nowait(self._latest[message_request_id])
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            subscribers = self._subscribers.get(message_request_id, set())
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(message_request_id, None)
+                self._latest.pop(message_request_id, None)
+                self._samples.pop(message_request_id, None)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="progress-hub")
+
+    async def _run(self) -> None:
+        if db_client.async_engine.dialect.name == "postgresql":
+            await self._listen()
+        else:
+            await self._poll()
+
+    async def _listen(self) -> None:
+        dsn = make_url(db_client.async_db_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _connection: closed.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                logger.info("Hub de progresso escutando o canal '%s'", self.channel)
+                # Atualizacoes emitidas enquanto nao havia LISTEN (inicio ou reconexao).
+                await self._refresh(list(self._subscribers))
+                await closed.wait()
+                logger.warning("Conexao LISTEN do hub de progresso encerrada; reconectando")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Falha no LISTEN do hub de progresso; nova tentativa em %ss",
+                    _LISTEN_RETRY_SECONDS,
+                )
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(_LISTEN_RETRY_SECONDS)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval_seconds)
+            await self._refresh(list(self._subscribers))
+
+    def _on_notification(self, _connection, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            row = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            logger.warning("Notificacao de progresso invalida: %s", payload)
+            return
+        if row.get("id") in self._subscribers:
+            self._publish(row)
+
+    async def _refresh(self, request_ids: Iterable[int]) -> None:
+        ids = list(request_ids)
+        if not ids:
+            return
+        try:
+            rows = await self._load(ids)
+        except Exception:
+            logger.exception("Falha ao consultar progresso das campanhas %s", ids)
+            return
+        for row in rows:
+            self._publish(row)
+
+    async def _load(self, request_ids: list[int]) -> list[dict[str, Any]]:
+        async with db_client.AsyncSessionLocal() as session:
+            return await MessageRequestRepository(session).list_progress(request_ids)
+
+    def _publish(self, row: dict[str, Any]) -> dict[str, Any]:
+        request_id = row["id"]
+        watched = request_id in self._subscribers
+        latest = self._latest.get(request_id)
+        if latest is not None and all(latest[key] == value for key, value in row.items()):
+            # Consulta periodica sem mudanca: nada a enviar.
+            return latest
+
+        progress = self._with_rate(row, self._samples.setdefault(request_id, deque()) if watched else deque())
+        if watched:
+            self._latest[request_id] = progress
+            for queue in self._subscribers[request_id]:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(progress)
+        return progress
+
+    def _with_rate(self, row: dict[str, Any], samples: deque[tuple[float, int]]) -> dict[str, Any]:
+        done = row["send_messages"] + row["failed_messages"]
+        # Campanhas ritmadas ainda tem validos nao publicados: o pendente conta desde a ingestao.
+        pending = max(0, row["published_messages"] - done, row["parsed_rows"] - row["rejected_rows"] - done)
+        now = time.monotonic()
+        samples.append((now, done))
+        while len(samples) > 1 and now - samples[0][0] > self.rate_window_seconds:
+            samples.popleft()
+
+        first_time, first_done = samples[0]
+        elapsed = now - first_time
+        rate = (done - first_done) / elapsed if elapsed > 0 else 0.0
+        if pending == 0:
+            eta_seconds = 0
+        elif rate > 0:
+            eta_seconds = round(pending / rate)
+        else:
+            eta_seconds = None
+        return {
+            **row,
+            "pending_messages": pending,
+            "rate_per_second": round(rate, 2),
+            "eta_seconds": eta_seconds,
+        }
+
+
+progress_hub = ProgressHub(
+    channel=settings.PROGRESS_NOTIFY_CHANNEL,
+    rate_window_seconds=settings.PROGRESS_RATE_WINDOW_SECONDS,
+    poll_interval_seconds=settings.PROGRESS_POLL_INTERVAL_SECONDS,
+)
@@ -1,29 +1,201 @@
-from io import BytesIO
+import asyncio
+import codecs
+import csv
+import shutil
+import uuid
+from collections.abc import Iterator, Sequence
+from itertools import islice
 from pathlib import Path
-from typing import Union
+from typing import Any, Union
 
-import pandas as pd
 from fastapi import HTTPException, UploadFile
-from starlette.datastructures import UploadFile as StarletteUploadFile
+from openpyxl import load_workbook
 from app.core.logger import get_logger
+from app.core.settings import settings
+
+# pyarrow e opcional (extra "parquet"); sem ele uploads .parquet sao recusados na rota.
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 logger = get_logger(__name__)
 
+SUPPORTED_UPLOAD_SUFFIXES = (".xlsx", ".csv") + ((".parquet",) if pq is not None else ())
+# Amostra do inicio do CSV usada para detectar codificacao e delimitador.
+CSV_SNIFF_BYTES = 64 * 1024
+CSV_DELIMITERS = ";,\t|"
+# Exportacoes de sistemas de RH no Windows costumam vir em cp1252 quando nao sao UTF-8.
+CSV_FALLBACK_ENCODING = "cp1252"
+
+
+async def save_upload_file(file: UploadFile, allowed_suffixes: Sequence[str] = (".xlsx",)) -> Path:
+    # Persiste o upload em disco para que o processamento continue depois da resposta HTTP.
+    suffix = Path((file.filename or "").lower()).suffix
+    if suffix not in allowed_suffixes:
+        raise HTTPException(status_code=400, detail=f"Arquivo deve ser {_suffixes_label(allowed_suffixes)}")
+
+    upload_dir = Path(settings.UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    destination = upload_dir / f"{uuid.uuid4().hex}{suffix}"
+
+    def _copy() -> None:
+        file.file.seek(0)
+        with destination.open("wb") as target:
+            shutil.copyfileobj(file.file, target)
+
+    await asyncio.to_thread(_copy)
+    return destination
+
+
+def iter_upload_chunks(
+    file_path: Union[str, Path],
+    columns: Sequence[str],
+    chunk_size: int | None = None,
+) -> Iterator[list[tuple[Any, ...]]]:
+    # Mesmo formato de bloco para todos os formatos aceitos: (linha, *colunas pedidas),
+    # com o cabecalho na linha 1 e linhas totalmente vazias descartadas.
+    path = Path(file_path)
+    size = chunk_size or settings.XLSX_STREAM_CHUNK_SIZE
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return _iter_chunks(_iter_csv_selected_rows(path, columns), size)
+    if suffix == ".parquet":
+        return _iter_chunks(_iter_parquet_selected_rows(path, columns, size), size)
+    return _iter_chunks(_iter_xlsx_selected_rows(path, columns), size)
+
+
+def _iter_chunks(rows: Iterator[tuple[Any, ...]], size: int) -> Iterator[list[tuple[Any, ...]]]:
+    try:
+        while chunk := _take_chunk(rows, size):
+            yield chunk
+    finally:
+        rows.close()
+
+
+def _iter_xlsx_selected_rows(path: Path, columns: Sequence[str]) -> Iterator[tuple[Any, ...]]:
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise HTTPException(status_code=400, detail="Planilha vazia")
+        indexes = _selected_indexes(header, columns)
+
+        # Cada tupla comeca com o numero da linha no Excel (cabecalho = linha 1), usado
+        # como chave do destinatario no acompanhamento de entrega.
+        for row_number, row in enumerate(rows, start=2):
+            selected = tuple(row[index] if index < len(row) else None for index in indexes)
+            # Linhas totalmente vazias (formatacao residual do Excel) sao ignoradas.
+            if all(value is None for value in selected):
+                continue
+            yield (row_number, *selected)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_selected_rows(path: Path, columns: Sequence[str]) -> Iterator[tuple[Any, ...]]:
+    encoding, delimiter = _sniff_csv(path)
+    errors = "replace" if encoding == CSV_FALLBACK_ENCODING else "strict"
+    try:
+        with path.open(newline="", encoding=encoding, errors=errors) as source:
+            reader = csv.reader(source, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                raise HTTPException(status_code=400, detail="Planilha vazia")
+            indexes = _selected_indexes(header, columns)
+
+            # Celulas vazias viram None, como no xlsx; os valores seguem como texto.
+            for row_number, row in enumerate(reader, start=2):
+                selected = tuple(
+                    row[index] if index < len(row) and row[index].strip() else None
+                    for index in indexes
+                )
+                if all(value is None for value in selected):
+                    continue
+                yield (row_number, *selected)
+    except UnicodeDecodeError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail=f"CSV com codificacao invalida (esperado {encoding}): {exc.reason}",
+        ) from exc
+
+
+def _sniff_csv(path: Path) -> tuple[str, str]:
+    with path.open("rb") as source:
+        sample_bytes = source.read(CSV_SNIFF_BYTES)
+
+    if sample_bytes.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            sample_bytes.decode("utf-8")
+            encoding = "utf-8"
+        except UnicodeDecodeError as exc:
+            # A amostra pode cortar um caractere multibyte no final e ainda ser UTF-8.
+            truncated = exc.reason == "unexpected end of data" and exc.start >= len(sample_bytes) - 3
+            encoding = "utf-8" if truncated else CSV_FALLBACK_ENCODING
+
+    sample = sample_bytes.decode(encoding, errors="ignore")
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=CSV_DELIMITERS).delimiter
+    except csv.Error:
+        # Sem padrao consistente (ex.: uma coluna so): o delimitador mais frequente no cabecalho.
+        header_line = sample.splitlines()[0] if sample else ""
+        delimiter = max(CSV_DELIMITERS, key=header_line.count)
+        if not header_line.count(delimiter):
+            delimiter = ","
+    return encoding, delimiter
+
+
+def _iter_parquet_selected_rows(
+    path: Path,
+    columns: Sequence[str],
+    batch_size: int,
+) -> Iterator[tuple[Any, ...]]:
+    if pq is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Upload .parquet indisponivel: instale o extra 'parquet' (pyarrow)",
+        )
+    parquet_file = pq.ParquetFile(path)
+    names = parquet_file.schema_arrow.names
+    selected_names = [names[index] for index in _selected_indexes(names, columns)]
+    # Le somente as colunas pedidas (projecao do parquet), cada uma uma unica vez.
+    unique_names = list(dict.fromkeys(selected_names))
+    positions = [unique_names.index(name) for name in selected_names]
+
+    row_number = 2
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=unique_names):
+        values = [batch.column(index).to_pylist() for index in range(len(unique_names))]
+        for offset, row in enumerate(zip(*(values[position] for position in positions))):
+            if all(value is None for value in row):
+                continue
+            yield (row_number + offset, *row)
+        row_number += batch.num_rows
+
+
+def _selected_indexes(header: Sequence[Any], columns: Sequence[str]) -> list[int]:
+    header_index = {
+        str(value).strip(): index
+        for index, value in enumerate(header)
+        if value is not None
+    }
+    missing = [column for column in columns if column.strip() not in header_index]
+    if missing:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Colunas nao encontradas na planilha: {', '.join(missing)}",
+        )
+    return [header_index[column.strip()] for column in columns]
+
 
-async def xlsx_to_dataframe(file: Union[UploadFile, bytes, str, Path]) -> pd.DataFrame:
-    if isinstance(file, (UploadFile, StarletteUploadFile)) or (
-        hasattr(file, "read") and hasattr(file, "filename")
-    ):
-        filename = (file.filename or "").lower()
-        if not filename.endswith(".xlsx"):
-            raise HTTPException(status_code=400, detail="Arquivo deve ser .xlsx")
-        content = await file.read()
-        return pd.read_excel(BytesIO(content), engine="openpyxl")
+def _suffixes_label(suffixes: Sequence[str]) -> str:
+    if len(suffixes) == 1:
+        return suffixes[0]
+    return f"{', '.join(suffixes[:-1])} ou {suffixes[-1]}"
 
-    if isinstance(file, bytes):
-        return pd.read_excel(BytesIO(file), engine="openpyxl")
 
-    path = Path(file)
-    if path.suffix.lower() != ".xlsx":
-        raise HTTPException(status_code=400, detail="Arquivo deve ser .xlsx")
-    return pd.read_excel(path, engine="openpyxl")
+def _take_chunk(rows: Iterator[tuple[Any, ...]], size: int) -> list[tuple[Any, ...]]:
+    return list(islice(rows, size))
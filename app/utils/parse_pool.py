@@ -0,0 +1,141 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+from collections.abc import AsyncIterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from fastapi import HTTPException
+
+from app.core.logger import get_logger
+from app.core.metrics import UPLOAD_PARSE_ROW_SECONDS, observe_rows
+from app.core.settings import settings
+from app.utils.file_utils import iter_upload_chunks
+
+logger = get_logger(__name__)
+
+# Marcadores trafegados pela fila entre o processo de parse e o event loop.
+_ROWS = "__rows__"
+_END_OF_FILE = "__eof__"
+_PARSE_ERROR = "__error__"
+_QUEUE_TIMEOUT_SECONDS = 1.0
+
+
+class SpreadsheetParsePool:
+    # Pool de processos compartilhado entre requests para o parse CPU-bound dos arquivos
+    # enviados (.xlsx, .csv, .parquet; o leitor e escolhido pela extensao).
+    # Cada job recebe os blocos por uma fila limitada, entao o parse nunca fica mais do que
+    # XLSX_PARSE_QUEUE_CHUNKS blocos a frente da publicacao.
+    def __init__(self, max_workers: int, queue_chunks: int):
+        self.max_workers = max_workers
+        self.queue_chunks = queue_chunks
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        logger.info("Pool de parse de planilhas iniciado com %s processos", self.max_workers)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    async def stream_rows(
+        self,
+        file_path: Path,
+        columns: Sequence[str],
+        chunk_size: int | None = None,
+    ) -> AsyncIterator[list[tuple[Any, ...]]]:
+        self.start()
+        parse_row_seconds = UPLOAD_PARSE_ROW_SECONDS.labels(Path(file_path).suffix.lower().lstrip("."))
+        chunks = self._manager.Queue(maxsize=self.queue_chunks)
+        cancel_event = self._manager.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._executor,
+            _parse_into_queue,
+            str(file_path),
+            list(columns),
+            chunk_size or settings.XLSX_STREAM_CHUNK_SIZE,
+            chunks,
+            cancel_event,
+        )
+        try:
+            while True:
+                item = await asyncio.to_thread(_get, chunks)
+                if item is None:
+                    if future.done():
+                        # O processo terminou sem enviar fim de arquivo (ex.: processo morto).
+                        await future
+                        raise RuntimeError("Processo de parse encerrou antes do fim do arquivo")
+                    continue
+                if item == _END_OF_FILE:
+                    break
+                if item[0] == _PARSE_ERROR:
+                    _, status_code, detail = item
+                    raise HTTPException(status_code=status_code, detail=detail)
+                # O tempo de parse e medido no processo filho e registrado aqui, onde
+                # ficam as metricas expostas pela API.
+                _, parse_seconds, chunk = item
+                observe_rows(parse_row_seconds, parse_seconds, len(chunk))
+                yield chunk
+            await future
+        finally:
+            # Libera o processo caso o consumidor pare antes do fim (erro no publish, cancelamento).
+            cancel_event.set()
+
+
+def _parse_into_queue(
+    file_path: str,
+    columns: list[str],
+    chunk_size: int,
+    chunks,
+    cancel_event,
+) -> None:
+    try:
+        rows = iter_upload_chunks(file_path, columns, chunk_size)
+        while True:
+            started = time.perf_counter()
+            chunk = next(rows, None)
+            if chunk is None:
+                break
+            if not _put(chunks, (_ROWS, time.perf_counter() - started, chunk), cancel_event):
+                return
+        _put(chunks, _END_OF_FILE, cancel_event)
+    except HTTPException as exc:
+        _put(chunks, (_PARSE_ERROR, exc.status_code, exc.detail), cancel_event)
+    except Exception as exc:
+        _put(chunks, (_PARSE_ERROR, 500, f"Falha ao ler planilha: {exc}"), cancel_event)
+
+
+def _get(chunks) -> Any:
+    try:
+        return chunks.get(timeout=_QUEUE_TIMEOUT_SECONDS)
+    except queue.Empty:
+        return None
+
+
+def _put(chunks, item: Any, cancel_event) -> bool:
+    while not cancel_event.is_set():
+        try:
+            chunks.put(item, timeout=_QUEUE_TIMEOUT_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+parse_pool = SpreadsheetParsePool(
+    max_workers=settings.XLSX_PARSE_MAX_WORKERS,
+    queue_chunks=settings.XLSX_PARSE_QUEUE_CHUNKS,
+)
@@ -0,0 +1,105 @@
+from collections.abc import Sequence
+from typing import Any
+
+import pandas as pd
+
+from app.core.logger import get_logger
+from app.utils.phone_utils import normalize_whatsapp_numbers, validate_whatsapp_numbers
+
+logger = get_logger(__name__)
+
+DUPLICATE_NUMBER_ERROR = "Numero de WhatsApp repetido na planilha"
+MISSING_TEMPLATE_FIELDS_ERROR = "Nome ou mes da folha de ponto vazio"
+
+
+def build_folha_ponto_payloads(
+    names: Sequence[Any],
+    months: Sequence[Any],
+    contacts: Sequence[Any],
+    user_id: int,
+    template_type: str,
+    message_request_id: int,
+    row_indexes: Sequence[int] | None = None,
+) -> list[dict[str, Any]]:
+    # Converte e normaliza cada coluna inteira de uma vez e so depois monta os
+    # payloads, evitando uma Series e varias chamadas a str() por linha.
+    if len(contacts) == 0:
+        return []
+
+    name_column = _text_column(names).tolist()
+    month_column = _text_column(months).tolist()
+    contact_column = normalize_whatsapp_numbers(contacts).tolist()
+    key_column = _idempotency_key_column(contact_column, message_request_id)
+
+    payloads = [
+        {
+            "name": name,
+            "month_folha_ponto": month,
+            "whatsapp_number": contact,
+            "user_id": user_id,
+            "template_type": template_type,
+            "message_request_id": message_request_id,
+            "idempotency_key": key,
+        }
+        for name, month, contact, key in zip(name_column, month_column, contact_column, key_column)
+    ]
+    if row_indexes is not None:
+        # Linha da planilha: identifica o destinatario em message_recipients.
+        for payload, row_index in zip(payloads, row_indexes):
+            payload["row_index"] = int(row_index)
+    return payloads
+
+
+def split_valid_payloads(
+    payloads: Sequence[dict[str, Any]],
+    raw_contacts: Sequence[Any],
+    seen_keys: set[str],
+    valid_status: str = "queued",
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    # Separa os payloads publicaveis dos rejeitados (numero invalido, nome ou mes vazio,
+    # numero repetido no job)
+    # e monta o registro de message_recipients de todas as linhas do bloco. Campanhas
+    # ritmadas gravam os validos como "pending" para o dispatcher publicar depois.
+    errors = validate_whatsapp_numbers(pd.Series([payload["whatsapp_number"] for payload in payloads]))
+    raw_column = _text_column(raw_contacts).tolist()
+
+    valid_payloads = []
+    recipients = []
+    for payload, error, raw_contact in zip(payloads, errors, raw_column):
+        key = payload["idempotency_key"]
+        if error is None and not (payload["name"] and payload["month_folha_ponto"]):
+            # Celula vazia vira "" em _text_column; o template da Meta exige os dois parametros.
+            error = MISSING_TEMPLATE_FIELDS_ERROR
+        if error is not None:
+            status = "rejected"
+        elif key in seen_keys:
+            status, error = "duplicate", DUPLICATE_NUMBER_ERROR
+        else:
+            status = valid_status
+            seen_keys.add(key)
+            valid_payloads.append(payload)
+        recipients.append(
+            {
+                "row_index": payload["row_index"],
+                # Rejeitados guardam o valor original da planilha para o relatorio.
+                "whatsapp_number": raw_contact if status == "rejected" else payload["whatsapp_number"],
+                "idempotency_key": key,
+                "name": payload["name"],
+                "month_folha_ponto": payload["month_folha_ponto"],
+                "status": status,
+                "error": error,
+            }
+        )
+    return valid_payloads, recipients
+
+
+def _text_column(values: Sequence[Any]) -> pd.Series:
+    column = pd.Series(values, dtype=object)
+    return column.where(column.notna(), "").astype(str).str.strip()
+
+
+def _idempotency_key_column(numbers: list[str], message_request_id: int) -> list[str | None]:
+    # Mesmo destinatario da campanha = mesma chave, independente da formatacao do numero
+    # na planilha; numeros sem digitos ficam sem chave.
+    prefix = f"{message_request_id}:"
+    return [prefix + number if number else None for number in numbers]
@@ -0,0 +1,61 @@
+import re
+from collections.abc import Sequence
+from typing import Any
+
+import pandas as pd
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Numeros lidos do Excel como float, ex: 41998233073.0
+FLOAT_INTEGER_PATTERN = r"^(\d+)\.0+$"
+# DDI 55 ja incluso no numero (o envio prefixa 55 de novo), ex: 5541998233073
+COUNTRY_CODE_PATTERN = r"^55(\d{10,})$"
+# DDD + numero: fixo (10 digitos) ou celular (11 digitos).
+VALID_NUMBER_LENGTHS = (10, 11)
+
+EMPTY_NUMBER_ERROR = "Numero de WhatsApp vazio ou sem digitos"
+INVALID_LENGTH_ERROR = "Numero de WhatsApp com quantidade de digitos invalida"
+
+
+def normalize_whatsapp_number(value: Any) -> str:
+    raw_value = str(value).strip()
+    if not raw_value or raw_value.lower() == "nan":
+        raise ValueError("whatsapp_number invalido no payload.")
+
+    # Corrige numeros lidos do Excel como float, ex: 41998233073.0
+    if re.fullmatch(r"\d+\.0+", raw_value):
+        raw_value = raw_value.split(".", 1)[0]
+
+    digits = "".join(char for char in raw_value if char.isdigit())
+    if not digits:
+        raise ValueError("whatsapp_number invalido no payload.")
+
+    # Evita duplicar DDI no envio (request_body ja prefixa com 55)
+    if digits.startswith("55") and len(digits) > 11:
+        digits = digits[2:]
+
+    return digits
+
+
+def normalize_whatsapp_numbers(values: Sequence[Any]) -> pd.Series:
+    # Mesmas regras de normalize_whatsapp_number aplicadas a coluna inteira;
+    # valores sem digitos viram "" em vez de levantar erro.
+    column = pd.Series(values, dtype=object)
+    text = column.where(column.notna(), "").astype(str).str.strip()
+    text = text.where(text.str.lower() != "nan", "")
+    return (
+        text.str.replace(FLOAT_INTEGER_PATTERN, r"\1", regex=True)
+        .str.replace(r"\D", "", regex=True)
+        .str.replace(COUNTRY_CODE_PATTERN, r"\1", regex=True)
+    )
+
+
+def validate_whatsapp_numbers(numbers: pd.Series) -> list[str | None]:
+    # Recebe a saida de normalize_whatsapp_numbers; None = numero valido.
+    lengths = numbers.str.len()
+    errors = pd.Series(None, index=numbers.index, dtype=object)
+    errors = errors.mask(~lengths.isin(VALID_NUMBER_LENGTHS), INVALID_LENGTH_ERROR)
+    errors = errors.mask(lengths == 0, EMPTY_NUMBER_ERROR)
+    return [error if isinstance(error, str) else None for error in errors.tolist()]
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from app.core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Intervalo minimo entre reducoes: os envios em voo recebem o mesmo 429 quase juntos.
+_DECREASE_COOLDOWN_SECONDS = 1.0
+
+
+class AdaptiveRateLimiter:
+    # Token bucket com ajuste AIMD: reduz a taxa multiplicativamente ao receber throttling
+    # e volta a subir aos poucos enquanto nao ha novos throttlings, ficando logo abaixo do limite.
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: float,
+        burst: int,
+        decrease_factor: float,
+        increase_step: float,
+        recovery_seconds: float,
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.burst = max(1, burst)
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.recovery_seconds = recovery_seconds
+        self.rate = max_rate
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._last_throttled_at = float("-inf")
+        self._last_increased_at = self._updated_at
+        self._lock: asyncio.Lock | None = None
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # O lock mantem a ordem de chegada: quem espera o proximo token segura a fila.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def on_throttled(self) -> None:
+        now = time.monotonic()
+        if now - self._last_throttled_at < _DECREASE_COOLDOWN_SECONDS:
+            return
+        self._refill()
+        previous_rate = self.rate
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+        self._tokens = min(self._tokens, 0.0)
+        self._last_throttled_at = now
+        logger.warning(
+            "Throttling da Meta detectado; taxa reduzida de %.2f para %.2f msg/s",
+            previous_rate,
+            self.rate,
+        )
+
+    def on_success(self) -> None:
+        if self.rate >= self.max_rate:
+            return
+        now = time.monotonic()
+        if now - max(self._last_throttled_at, self._last_increased_at) < self.recovery_seconds:
+            return
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.increase_step)
+        self._last_increased_at = now
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
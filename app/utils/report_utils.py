@@ -0,0 +1,39 @@
+import csv
+from collections.abc import Sequence
+from io import BytesIO, StringIO
+
+from openpyxl import Workbook
+
+from app.core.logger import get_logger
+from app.infra.db.models import MessageRecipient
+
+logger = get_logger(__name__)
+
+REJECTED_ROWS_HEADER = ("linha", "contato", "status", "motivo")
+
+
+def build_rejected_rows_csv(recipients: Sequence[MessageRecipient]) -> bytes:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REJECTED_ROWS_HEADER)
+    writer.writerows(_rejected_rows(recipients))
+    # BOM para o Excel abrir o CSV como UTF-8.
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def build_rejected_rows_xlsx(recipients: Sequence[MessageRecipient]) -> bytes:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("rejeitados")
+    sheet.append(REJECTED_ROWS_HEADER)
+    for row in _rejected_rows(recipients):
+        sheet.append(row)
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _rejected_rows(recipients: Sequence[MessageRecipient]) -> list[tuple]:
+    return [
+        (recipient.row_index, recipient.whatsapp_number, recipient.status, recipient.error or "")
+        for recipient in recipients
+    ]
@@ -0,0 +1,62 @@
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+
+from app.core.logger import get_logger
+from app.core.settings import settings
+
+logger = get_logger(__name__)
+
+
+def dispatch_timezone() -> ZoneInfo:
+    return ZoneInfo(settings.DISPATCH_TIMEZONE)
+
+
+def to_utc_naive(value: datetime | None) -> datetime | None:
+    # O banco guarda UTC sem fuso (como created_at); data sem fuso e horario local das
+    # campanhas (DISPATCH_TIMEZONE).
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=dispatch_timezone())
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def validate_campaign_schedule(
+    send_window_start: time | None,
+    send_window_end: time | None,
+    messages_per_minute: int | None,
+) -> None:
+    if (send_window_start is None) != (send_window_end is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Informe send_window_start e send_window_end juntos",
+        )
+    if send_window_start is not None and send_window_start == send_window_end:
+        raise HTTPException(
+            status_code=400,
+            detail="Janela de envio vazia: send_window_start igual a send_window_end",
+        )
+    if messages_per_minute is not None and messages_per_minute < 1:
+        raise HTTPException(status_code=400, detail="messages_per_minute deve ser maior que zero")
+
+
+def is_paced(
+    scheduled_at: datetime | None,
+    send_window_start: time | None,
+    messages_per_minute: int | None,
+) -> bool:
+    # Qualquer opcao de agendamento leva a campanha para o dispatcher.
+    return scheduled_at is not None or send_window_start is not None or messages_per_minute is not None
+
+
+def is_within_send_window(moment_utc: datetime, start: time | None, end: time | None) -> bool:
+    if start is None or end is None:
+        return True
+    local = moment_utc.replace(tzinfo=timezone.utc).astimezone(dispatch_timezone()).time()
+    start, end = start.replace(tzinfo=None), end.replace(tzinfo=None)
+    if start < end:
+        return start <= local < end
+    # Janela que atravessa a meia-noite (ex.: 22:00-06:00).
+    return local >= start or local < end
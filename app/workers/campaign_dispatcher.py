@@ -0,0 +1,223 @@
+import asyncio
+import signal
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+from app.core.logger import get_logger, setup_logging
+from app.core.metrics import DISPATCHER_PUBLISHED, DISPATCHER_THROTTLED, start_metrics_server
+from app.core.settings import settings
+from app.infra.db.db_client import db_client
+from app.infra.db.models import MessageRequest
+from app.infra.db.repositories.message_recipient_repository import MessageRecipientRepository
+from app.infra.db.repositories.message_request_repository import MessageRequestRepository
+from app.infra.rabbitmq.rabbitmq_client import RabbitMQ
+from app.utils.schedule_utils import is_within_send_window
+
+setup_logging()
+logger = get_logger(__name__)
+
+
+class CampaignDispatcher:
+    # Publica os destinatarios "pending" das campanhas ritmadas (scheduled_at, janela de
+    # envio, messages_per_minute) a cada DISPATCH_INTERVAL_SECONDS. Cada campanha tem um
+    # balde de tokens em memoria (messages_per_minute / 60 por segundo, acumulando no
+    # maximo um ciclo), e o total publicado no ciclo respeita a folga da fila
+    # (DISPATCH_MAX_QUEUE_DEPTH menos as mensagens prontas): o worker nunca recebe uma
+    # rajada maior do que consegue consumir. Deve rodar uma unica instancia.
+    # A janela de envio vale so para a publicacao: mensagens ja na fila (ou em retry)
+    # quando a janela fecha ainda sao enviadas pelo worker.
+    def __init__(
+        self,
+        interval_seconds: float,
+        batch_size: int,
+        max_queue_depth: int,
+        metrics_port: int,
+    ):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.max_queue_depth = max_queue_depth
+        self.metrics_port = metrics_port
+        self.claim_timeout = timedelta(seconds=settings.DISPATCH_CLAIM_TIMEOUT_SECONDS)
+        self.queue_name = settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS
+        self.rabbitmq_client = RabbitMQ()
+        # message_request_id -> (tokens disponiveis, instante da ultima recarga).
+        self._buckets: dict[int, tuple[float, float]] = {}
+        self._shutdown_requested = asyncio.Event()
+
+    async def start(self) -> None:
+        start_metrics_server(self.metrics_port)
+        await self.rabbitmq_client.ensure_queue(self.queue_name)
+        # Instancia unica: toda reserva existente na partida e de um processo anterior.
+        await self._release_stale_claims(datetime.utcnow())
+        logger.info(
+            "Dispatcher de campanhas iniciado (fila=%s, intervalo=%ss, profundidade maxima=%s)",
+            self.queue_name,
+            self.interval_seconds,
+            self.max_queue_depth,
+        )
+        try:
+            while not self._shutdown_requested.is_set():
+                started = time.monotonic()
+                try:
+                    await self.dispatch_once()
+                except Exception:
+                    logger.exception("Falha no ciclo do dispatcher; nova tentativa no proximo ciclo")
+                remaining = self.interval_seconds - (time.monotonic() - started)
+                try:
+                    await asyncio.wait_for(self._shutdown_requested.wait(), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.rabbitmq_client.close()
+            logger.info("Dispatcher de campanhas encerrado")
+
+    def request_shutdown(self) -> None:
+        # Chamado pelo handler de SIGTERM/SIGINT: o ciclo em andamento termina (publish
+        # confirmado e contadores gravados) antes de sair.
+        if not self._shutdown_requested.is_set():
+            logger.info("Encerramento do dispatcher solicitado")
+        self._shutdown_requested.set()
+
+    async def _release_stale_claims(self, claimed_before: datetime) -> None:
+        async with db_client.AsyncSessionLocal() as session:
+            released = await MessageRecipientRepository(session).release_stale_claims(claimed_before)
+            await session.commit()
+        if released:
+            logger.warning("%s destinatarios reservados sem publish confirmado voltaram para o despacho", released)
+
+    async def dispatch_once(self) -> int:
+        now = datetime.utcnow()
+        await self._release_stale_claims(now - self.claim_timeout)
+        async with db_client.AsyncSessionLocal() as session:
+            campaigns = await MessageRequestRepository(session).list_dispatchable(now)
+        # Baldes de campanhas que sairam do despacho (concluidas ou com falha).
+        active_ids = {campaign.id for campaign in campaigns}
+        for request_id in set(self._buckets) - active_ids:
+            del self._buckets[request_id]
+        if not campaigns:
+            return 0
+
+        headroom = self.max_queue_depth - await self.rabbitmq_client.queue_message_count(self.queue_name)
+        if headroom <= 0:
+            DISPATCHER_THROTTLED.inc()
+            logger.info(
+                "Fila '%s' no limite de %s mensagens prontas; aguardando o worker",
+                self.queue_name,
+                self.max_queue_depth,
+            )
+            return 0
+
+        published_total = 0
+        for campaign in campaigns:
+            if headroom <= 0:
+                break
+            if not is_within_send_window(now, campaign.send_window_start, campaign.send_window_end):
+                # Fora da janela o balde nao acumula: a reabertura nao comeca com rajada.
+                self._buckets.pop(campaign.id, None)
+                continue
+            quota = min(self._available(campaign), headroom)
+            if quota <= 0:
+                continue
+            published = await self._dispatch_campaign(campaign, quota)
+            if campaign.messages_per_minute is not None:
+                tokens, refilled_at = self._buckets[campaign.id]
+                self._buckets[campaign.id] = (tokens - published, refilled_at)
+            headroom -= published
+            published_total += published
+        return published_total
+
+    def _available(self, campaign: MessageRequest) -> int:
+        if campaign.messages_per_minute is None:
+            return self.batch_size
+        rate = campaign.messages_per_minute / 60
+        now = time.monotonic()
+        tokens, refilled_at = self._buckets.get(campaign.id, (None, now))
+        elapsed = now - refilled_at
+        # Acumula no maximo um ciclo (ou o atraso do ultimo ciclo), com pelo menos uma
+        # mensagem para que ritmos abaixo de 1 por ciclo tambem avancem.
+        burst = max(1.0, rate * max(self.interval_seconds, elapsed))
+        tokens = burst if tokens is None else min(burst, tokens + rate * elapsed)
+        self._buckets[campaign.id] = (tokens, now)
+        return min(int(tokens), self.batch_size)
+
+    async def _dispatch_campaign(self, campaign: MessageRequest, quota: int) -> int:
+        async with db_client.AsyncSessionLocal() as session:
+            recipients = MessageRecipientRepository(session)
+            requests = MessageRequestRepository(session)
+            claimed = await recipients.claim_pending(campaign.id, quota)
+            if not claimed:
+                if await recipients.has_claimed(campaign.id):
+                    # Reservas antigas ainda sem publish: a campanha so encerra o despacho
+                    # depois que a varredura as devolver e elas forem publicadas.
+                    return 0
+                # Tudo publicado: segue o fluxo normal e o worker finaliza em "finish".
+                await requests.update_dispatch_status(campaign.id, "requested")
+                await requests.finish_completed([campaign.id])
+                await requests.notify_progress([campaign.id])
+                await session.commit()
+                logger.info("Campanha totalmente publicada. message_request_id=%s", campaign.id)
+                return 0
+            if campaign.status == "scheduled":
+                await requests.update_dispatch_status(campaign.id, "dispatching")
+            # Reservas ("claimed") gravadas antes do publish: o worker sempre encontra a
+            # linha para registrar o resultado, e uma reserva sem publish confirmado
+            # (crash no meio do ciclo) volta como "released" pela varredura.
+            await session.commit()
+
+            payloads = [self._build_payload(campaign, recipient) for recipient in claimed]
+            try:
+                published = await self.rabbitmq_client.publish_many(self.queue_name, payloads)
+            except Exception:
+                logger.exception(
+                    "Falha ao publicar %s destinatarios; voltam para o despacho. message_request_id=%s",
+                    len(claimed),
+                    campaign.id,
+                )
+                await recipients.release_claimed(campaign.id, [recipient["row_index"] for recipient in claimed])
+                await session.commit()
+                return 0
+
+            await recipients.mark_queued(campaign.id, [recipient["row_index"] for recipient in claimed])
+            await requests.increment_published_messages({campaign.id: published})
+            await requests.notify_progress([campaign.id])
+            await session.commit()
+        DISPATCHER_PUBLISHED.inc(published)
+        logger.info("Destinatarios publicados. message_request_id=%s quantidade=%s", campaign.id, published)
+        return published
+
+    def _build_payload(self, campaign: MessageRequest, recipient: dict[str, Any]) -> dict[str, Any]:
+        # Mesmo formato publicado pela ingestao (build_folha_ponto_payloads).
+        return {
+            "name": recipient["name"],
+            "month_folha_ponto": recipient["month_folha_ponto"],
+            "whatsapp_number": recipient["whatsapp_number"],
+            "user_id": campaign.user_id,
+            "template_type": campaign.template_type,
+            "message_request_id": campaign.id,
+            "idempotency_key": recipient["idempotency_key"],
+            "row_index": recipient["row_index"],
+            # Linha devolvida de uma reserva antiga: pode haver outra mensagem dela na fila,
+            # entao o worker consulta a idempotencia no banco.
+            **({"republished": True} if recipient["republished"] else {}),
+        }
+
+
+async def main() -> None:
+    dispatcher = CampaignDispatcher(
+        interval_seconds=settings.DISPATCH_INTERVAL_SECONDS,
+        batch_size=settings.DISPATCH_BATCH_SIZE,
+        max_queue_depth=settings.DISPATCH_MAX_QUEUE_DEPTH,
+        metrics_port=settings.METRICS_DISPATCHER_PORT,
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, dispatcher.request_shutdown)
+    try:
+        await dispatcher.start()
+    finally:
+        await db_client.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,140 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any
+
+from app.core.logger import get_logger
+from app.core.metrics import DELIVERY_FLUSH_SECONDS
+from app.infra.db.db_client import db_client
+from app.infra.db.repositories.message_recipient_repository import MessageRecipientRepository
+from app.infra.db.repositories.message_request_repository import MessageRequestRepository
+
+logger = get_logger(__name__)
+
+
+class DeliveryCounterAggregator:
+    # Acumula os envios com sucesso em memoria e grava no banco a cada intervalo
+    # (write-behind): uma ida ao banco por flush em vez de uma por mensagem.
+    # O resultado de cada destinatario segue o mesmo caminho, no mesmo commit.
+    # Quem precisa do resultado gravado (o worker, antes do ack) chama wait_durable():
+    # o flush e antecipado e agrupa os envios que chegarem em group_commit_seconds.
+    def __init__(self, flush_interval_seconds: float, group_commit_seconds: float = 0.0):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.group_commit_seconds = group_commit_seconds
+        self._pending: dict[int, int] = {}
+        self._outcomes: list[dict[str, Any]] = []
+        self._task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        # Lote em acumulacao e ultimo lote com commit; cada flush fecha um lote.
+        self._batch = 1
+        self._durable_batch = 0
+        self._committed = asyncio.Event()
+
+    def increment(self, message_request_id: int, amount: int = 1) -> None:
+        self._pending[message_request_id] = self._pending.get(message_request_id, 0) + amount
+
+    def record_outcome(
+        self,
+        message_request_id: int,
+        row_index: int,
+        status: str,
+        meta_message_id: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        self._outcomes.append(
+            {
+                "message_request_id": message_request_id,
+                "row_index": row_index,
+                "status": status,
+                "meta_message_id": meta_message_id,
+                "error": error,
+                "updated_at": datetime.utcnow(),
+            }
+        )
+
+    async def wait_durable(self) -> None:
+        # Retorna quando tudo o que foi registrado ate aqui ja tem commit no banco. Se o
+        # flush falhar, continua esperando a proxima tentativa.
+        target = self._batch if self._pending or self._outcomes else self._batch - 1
+        while self._durable_batch < target:
+            committed = self._committed
+            self._flush_requested.set()
+            await committed.wait()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval_seconds)
+                # Janela de group commit: um flush atende todos os que esperam nela.
+                await asyncio.sleep(self.group_commit_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending and not self._outcomes:
+            return
+        batch = self._batch
+        self._batch += 1
+        increments, self._pending = self._pending, {}
+        outcomes, self._outcomes = self._outcomes, []
+        started = time.perf_counter()
+        try:
+            finished = await self._write(increments, outcomes)
+        except Exception:
+            # Devolve os incrementos para o proximo flush; nenhum envio deixa de ser contado.
+            for request_id, amount in increments.items():
+                self.increment(request_id, amount)
+            self._outcomes[:0] = outcomes
+            logger.exception("Falha ao gravar contadores de envio; nova tentativa no proximo flush")
+            return
+        DELIVERY_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        self._durable_batch = batch
+        committed, self._committed = self._committed, asyncio.Event()
+        committed.set()
+
+        for request_id in finished:
+            logger.info(
+                "Fluxo finalizado. message_request_id=%s status=finish",
+                request_id,
+            )
+
+    async def _write(
+        self,
+        increments: dict[int, int],
+        outcomes: list[dict[str, Any]],
+    ) -> list[int]:
+        failed: dict[int, int] = {}
+        for outcome in outcomes:
+            if outcome["status"] == "failed":
+                request_id = outcome["message_request_id"]
+                failed[request_id] = failed.get(request_id, 0) + 1
+
+        async with db_client.AsyncSessionLocal() as session:
+            await MessageRecipientRepository(session).update_outcomes(outcomes)
+            repository = MessageRequestRepository(session)
+            await repository.increment_send_messages(increments)
+            await repository.increment_failed_messages(failed)
+            changed = increments.keys() | failed.keys()
+            finished = await repository.finish_completed(changed)
+            # Um NOTIFY por campanha alterada, entregue junto com o commit do flush.
+            await repository.notify_progress(changed)
+            await session.commit()
+            return finished
@@ -1,79 +1,392 @@
 import asyncio
-import json
-from collections.abc import Callable
+import signal
+from collections.abc import Callable, Sequence
 from typing import Any
 
 import aio_pika
-from sqlalchemy import update
+import httpx
 
 from app.core.logger import get_logger, setup_logging
+from app.core.metrics import (
+    WORKER_BACKUP_MESSAGES,
+    WORKER_MESSAGES_CONSUMED,
+    WORKER_SENDS_IN_FLIGHT,
+    start_metrics_server,
+)
 from app.core.settings import settings
 from app.infra.db.db_client import db_client
-from app.infra.db.models import MessageRequest
-from app.infra.rabbitmq.rabbitmq_client import RabbitMQ
-from app.services.meta_request_service import MetaRequestService
+from app.infra.db.repositories.message_recipient_repository import MessageRecipientRepository
+from app.infra.rabbitmq.codecs import decode_body
+from app.infra.rabbitmq.rabbitmq_client import BATCH_ENVELOPE_KEY, RabbitMQ
+from app.services.meta_request_service import MetaRequestService, MetaThrottledError
+from app.utils.cache import LRUCache
+from app.workers.delivery_counter import DeliveryCounterAggregator
 
 setup_logging()
 logger = get_logger(__name__)
 
+RETRY_COUNT_HEADER = "x-retry-count"
+# Campo do payload posto pelo dispatcher ao republicar uma reserva sem publish confirmado.
+REPUBLISHED_FIELD = "republished"
+
+
+def worker_queue_names() -> list[str]:
+    return [
+        settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS,
+        settings.RABBITMQ_QUEUE_FOLHA_PONTO_INATIVOS,
+        settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS_TORRE,
+        settings.RABBITMQ_QUEUE_VAGAS,
+    ]
+
 
 class MetaQueueWorker:
-    def __init__(self):
+    def __init__(
+        self,
+        queue_names: Sequence[str] | None = None,
+        metrics_port: int | None = None,
+        max_rate: float | None = None,
+    ):
         self.rabbitmq_client = RabbitMQ()
-        self.meta_request_service = MetaRequestService()
-        self._delivered_counter_by_request: dict[int, int] = {}
-        self._request_locks: dict[int, asyncio.Lock] = {}
+        self.meta_request_service = MetaRequestService(max_rate=max_rate)
+        self.delivery_counter = DeliveryCounterAggregator(
+            flush_interval_seconds=settings.DELIVERY_COUNTER_FLUSH_INTERVAL_SECONDS,
+            group_commit_seconds=settings.DELIVERY_COUNTER_GROUP_COMMIT_SECONDS,
+        )
+        self.metrics_port = settings.METRICS_WORKER_PORT if metrics_port is None else metrics_port
+        self._in_flight: set[asyncio.Task] = set()
+        self._shutdown_requested = asyncio.Event()
+        # Chaves de idempotencia enviadas por este processo (checagem local, sem I/O).
+        self.sent_keys = LRUCache(maxsize=settings.META_IDEMPOTENCY_CACHE_SIZE)
         self.queue_handlers: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
             settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS: self._build_folha_ponto_ativos_meta_payload,
             settings.RABBITMQ_QUEUE_FOLHA_PONTO_INATIVOS: self._build_folha_ponto_inativos_meta_payload,
             settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS_TORRE: self._build_folha_ponto_ativos_torre_meta_payload,
             settings.RABBITMQ_QUEUE_VAGAS: self._build_vagas_meta_payload,
         }
+        # Subconjunto de filas consumidas por este processo (supervisor); padrao: todas.
+        self.queue_names = list(dict.fromkeys(queue_names or self.queue_handlers))
+        unknown = [queue_name for queue_name in self.queue_names if queue_name not in self.queue_handlers]
+        if unknown:
+            raise ValueError(f"Fila sem handler configurado: {', '.join(unknown)}")
+        # Gauges por fila resolvidos uma vez; cada envio so incrementa/decrementa.
+        self._sends_in_flight = {
+            queue_name: WORKER_SENDS_IN_FLIGHT.labels(queue_name) for queue_name in self.queue_names
+        }
+        # Envios simultaneos por fila: um envelope ocupa um slot do consumo, mas cada
+        # destinatario dele disputa os mesmos N slots de envio que as mensagens avulsas.
+        self._send_slots = {
+            queue_name: asyncio.Semaphore(self._queue_concurrency(queue_name)) for queue_name in self.queue_names
+        }
 
     async def start(self) -> None:
-        for queue_name in self.queue_handlers:
-            await self.rabbitmq_client.ensure_queue(queue_name)
-            logger.info("Worker aguardando mensagens na fila '%s'", queue_name)
+        start_metrics_server(self.metrics_port)
+        await self.meta_request_service.start()
+        self.delivery_counter.start()
+        consumers: list[asyncio.Task] = []
+        try:
+            for queue_name in self.queue_names:
+                await self.rabbitmq_client.ensure_queue(queue_name)
+                for delay_seconds in set(settings.META_RETRY_DELAYS_SECONDS):
+                    await self.rabbitmq_client.ensure_delay_queue(queue_name, delay_seconds)
+                logger.info("Worker aguardando mensagens na fila '%s'", queue_name)
+
+            consumers = [
+                asyncio.create_task(self._consume_queue(queue_name))
+                for queue_name in self.queue_names
+            ]
+            # Os consumidores terminam quando request_shutdown() cancela o consumo no broker.
+            await asyncio.gather(*consumers)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
+            # Ordem do encerramento: envios em andamento terminam (ack/nack de cada um),
+            # os contadores pendentes vao para o banco e so entao a conexao AMQP fecha.
+            await self._drain_in_flight()
+            await self.delivery_counter.stop()
+            await self.meta_request_service.close()
+            await self.rabbitmq_client.close()
+
+    def request_shutdown(self) -> None:
+        # Chamado pelo handler de SIGTERM/SIGINT; idempotente.
+        if self._shutdown_requested.is_set():
+            return
+        logger.info(
+            "Encerramento solicitado: parando o consumo com %s mensagens em andamento",
+            len(self._in_flight),
+        )
+        self._shutdown_requested.set()
+
+    async def _drain_in_flight(self) -> None:
+        if not self._in_flight:
+            return
+        pending_tasks = set(self._in_flight)
+        logger.info("Aguardando %s mensagens em andamento antes de encerrar", len(pending_tasks))
+        _, pending = await asyncio.wait(pending_tasks, timeout=settings.WORKER_SHUTDOWN_GRACE_SECONDS)
+        if not pending:
+            return
+        # Sem ack, o broker reentrega essas mensagens e a idempotencia e checada no banco,
+        # que recebe no flush final os envios ja concluidos.
+        logger.warning(
+            "%s mensagens nao terminaram em %ss; voltam para a fila",
+            len(pending),
+            settings.WORKER_SHUTDOWN_GRACE_SECONDS,
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
 
-        consumers = [
-            asyncio.create_task(self._consume_queue(queue_name))
-            for queue_name in self.queue_handlers
-        ]
-        await asyncio.gather(*consumers)
+    def _queue_concurrency(self, queue_name: str) -> int:
+        concurrency = settings.META_WORKER_QUEUE_CONCURRENCY.get(
+            queue_name, settings.META_WORKER_CONCURRENCY
+        )
+        return max(1, concurrency)
 
     async def _consume_queue(self, queue_name: str) -> None:
-        queue = await self.rabbitmq_client.channel.get_queue(queue_name)
+        # Canal proprio por fila para que o prefetch (basic_qos) valha por fila.
+        concurrency = self._queue_concurrency(queue_name)
+        channel = await self.rabbitmq_client.connection.channel()
+        await channel.set_qos(prefetch_count=concurrency)
+        queue = await channel.get_queue(queue_name)
+        semaphore = asyncio.Semaphore(concurrency)
+        consumed = WORKER_MESSAGES_CONSUMED.labels(queue_name)
+        logger.info("Consumindo fila '%s' com concorrencia=%s", queue_name, concurrency)
+
         async with queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                await self._handle_message(queue_name, message)
+            stop_watcher = asyncio.create_task(self._close_on_shutdown(queue_name, queue_iter))
+            try:
+                async for message in queue_iter:
+                    consumed.inc()
+                    await semaphore.acquire()
+                    task = asyncio.create_task(self._handle_message_bounded(queue_name, message, semaphore))
+                    self._in_flight.add(task)
+                    task.add_done_callback(self._in_flight.discard)
+            finally:
+                stop_watcher.cancel()
+
+    async def _close_on_shutdown(self, queue_name: str, queue_iter: aio_pika.abc.AbstractQueueIterator) -> None:
+        # basic.cancel: o broker para de entregar e as mensagens ainda no buffer local
+        # (no maximo o prefetch) voltam para a fila; as ja recebidas seguem ate o ack.
+        await self._shutdown_requested.wait()
+        await queue_iter.close()
+        logger.info("Consumo da fila '%s' encerrado", queue_name)
+
+    async def _handle_message_bounded(
+        self,
+        queue_name: str,
+        message: aio_pika.IncomingMessage,
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        # Cada mensagem faz ack/nack no proprio fluxo, assim que o seu resultado e conhecido.
+        try:
+            await self._handle_message(queue_name, message)
+        finally:
+            semaphore.release()
 
     async def _handle_message(self, queue_name: str, message: aio_pika.IncomingMessage) -> None:
-        payload: dict[str, Any] | None = None
         try:
-            payload = json.loads(message.body.decode())
-            meta_payload = self._build_meta_payload(queue_name, payload)
-            meta_response = await self.meta_request_service.send_template_message(meta_payload)
-            print("Meta API response:", json.dumps(meta_response, ensure_ascii=False))
-            self._assert_meta_delivery_success(meta_response)
-            await self._register_delivery_success(payload)
+            payload = decode_body(message.body, message.content_type)
+        except Exception as exc:
+            await self._settle_failure(queue_name, message, None, exc)
+            return
+
+        if isinstance(payload, dict) and BATCH_ENVELOPE_KEY in payload:
+            await self._handle_batch(queue_name, message, payload[BATCH_ENVELOPE_KEY])
+            return
+
+        try:
+            sent_keys = await self._find_sent_keys([payload], self._may_be_duplicate(message))
+            await self._send(queue_name, payload, sent_keys)
+            # Ack so depois do commit do "sent": uma reentrega apos crash encontra a chave.
+            await self.delivery_counter.wait_durable()
             await message.ack()
-            logger.info(
-                "Mensagem enviada para Meta com sucesso. fila=%s template=%s user_id=%s",
-                queue_name,
-                meta_payload.get("template_name"),
-                payload.get("user_id"),
-            )
         except Exception as exc:
-            logger.exception("Falha no envio para Meta: %s", exc)
+            await self._settle_failure(queue_name, message, payload, exc)
+
+    async def _handle_batch(
+        self,
+        queue_name: str,
+        message: aio_pika.IncomingMessage,
+        items: list[Any],
+    ) -> None:
+        # Um envelope com N destinatarios: envios concorrentes e um resultado por destinatario.
+        # Falhas sao republicadas individualmente (retry/backup); o envelope so recebe ack
+        # depois que todos os destinatarios tem destino garantido.
+        try:
+            sent_keys = await self._find_sent_keys(items, self._may_be_duplicate(message))
+        except Exception as exc:
+            await self._settle_failure(queue_name, message, None, exc)
+            return
+        results = await asyncio.gather(
+            *(self._send(queue_name, item, sent_keys) for item in items),
+            return_exceptions=True,
+        )
+        unsettled: list[Any] = []
+        for item, result in zip(items, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if not isinstance(result, Exception):
+                continue
             try:
-                await self._publish_backup(queue_name, payload, message.body, str(exc))
-                await message.ack()
-            except Exception as backup_exc:
+                await self._republish_failure(queue_name, item, repr(item).encode(), result, 0)
+            except Exception as republish_exc:
+                logger.exception("Falha ao republicar destinatario do lote: %s", republish_exc)
+                unsettled.append(item)
+        await self.delivery_counter.wait_durable()
+        if unsettled:
+            # So os destinatarios sem destino voltam, em um envelope novo: os ja enviados
+            # ou republicados nao sao reprocessados.
+            try:
+                await self.rabbitmq_client.publish(queue_name, {BATCH_ENVELOPE_KEY: unsettled})
+            except Exception as publish_exc:
                 logger.exception(
-                    "Falha ao mover mensagem para backup, reencaminhando para reprocessamento: %s",
-                    backup_exc,
+                    "Falha ao reencaminhar %s destinatarios do lote, reencaminhando lote para reprocessamento: %s",
+                    len(unsettled),
+                    publish_exc,
                 )
                 await message.nack(requeue=True)
+                return
+        await message.ack()
+
+    async def _send(self, queue_name: str, payload: dict[str, Any], sent_keys: set[str]) -> None:
+        if payload.get("idempotency_key") in sent_keys:
+            logger.info(
+                "Mensagem ja enviada anteriormente; envio ignorado. fila=%s idempotency_key=%s",
+                queue_name,
+                payload.get("idempotency_key"),
+            )
+            return
+        meta_payload = self._build_meta_payload(queue_name, payload)
+        in_flight = self._sends_in_flight[queue_name]
+        async with self._send_slots[queue_name]:
+            in_flight.inc()
+            try:
+                meta_response = await self.meta_request_service.send_template_message(meta_payload)
+            finally:
+                in_flight.dec()
+        logger.debug("Resposta da Meta: %s", meta_response)
+        self._assert_meta_delivery_success(meta_response)
+        self._remember_sent(payload)
+        self._register_delivery_success(payload, meta_response)
+        logger.info(
+            "Mensagem enviada para Meta com sucesso. fila=%s template=%s user_id=%s",
+            queue_name,
+            meta_payload.get("template_name"),
+            payload.get("user_id"),
+        )
+
+    async def _settle_failure(
+        self,
+        queue_name: str,
+        message: aio_pika.IncomingMessage,
+        payload: dict[str, Any] | None,
+        exc: Exception,
+    ) -> None:
+        try:
+            await self._republish_failure(
+                queue_name, payload, message.body, exc, self._retry_count(message)
+            )
+            await message.ack()
+        except Exception as backup_exc:
+            logger.exception(
+                "Falha ao mover mensagem para retry/backup, reencaminhando para reprocessamento: %s",
+                backup_exc,
+            )
+            await message.nack(requeue=True)
+
+    async def _republish_failure(
+        self,
+        queue_name: str,
+        payload: Any,
+        raw_body: bytes,
+        exc: Exception,
+        retry_count: int,
+    ) -> None:
+        if not isinstance(payload, dict):
+            payload = None
+        if payload is not None and self._should_retry(exc, retry_count):
+            logger.warning(
+                "Falha transitoria no envio para Meta (tentativa %s/%s): %s",
+                retry_count + 1,
+                settings.META_RETRY_MAX_ATTEMPTS,
+                exc,
+            )
+            await self._publish_retry(queue_name, payload, retry_count + 1)
+            self._register_recipient_outcome(payload, "retrying", error=str(exc))
+        else:
+            logger.error("Falha no envio para Meta: %s", exc, exc_info=exc)
+            await self._publish_backup(queue_name, payload, raw_body, str(exc), retry_count)
+            self._register_recipient_outcome(payload, "failed", error=str(exc))
+
+    def _may_be_duplicate(self, message: aio_pika.IncomingMessage) -> bool:
+        # Reentrega (crash/falha antes do ack) ou retry: o envio pode ja ter acontecido.
+        return bool(message.redelivered) or self._retry_count(message) > 0
+
+    async def _find_sent_keys(self, payloads: list[Any], may_be_duplicate: bool) -> set[str]:
+        # Chaves ja enviadas: primeiro o LRU local (sem I/O). O banco so e consultado quando
+        # pode haver duplicidade (reentrega, retry ou payload republicado pelo dispatcher),
+        # em uma consulta por mensagem/envelope; no primeiro consumo a chave nunca foi
+        # enviada (a ingestao ja remove repetidos) e o envio nao tem ida ao banco.
+        keys: set[str] = set()
+        for payload in payloads:
+            if not isinstance(payload, dict) or not payload.get("idempotency_key"):
+                continue
+            if may_be_duplicate or payload.get(REPUBLISHED_FIELD):
+                keys.add(payload["idempotency_key"])
+        known = {
+            payload["idempotency_key"]
+            for payload in payloads
+            if isinstance(payload, dict) and payload.get("idempotency_key") in self.sent_keys
+        }
+        unknown = keys - known
+        if not unknown:
+            return known
+        try:
+            stored = await self._load_sent_keys(unknown)
+        except Exception:
+            logger.exception("Falha ao consultar idempotencia no banco; seguindo com o envio.")
+            return known
+        for key in stored:
+            self.sent_keys.set(key)
+        return known | stored
+
+    async def _load_sent_keys(self, keys: set[str]) -> set[str]:
+        async with db_client.AsyncSessionLocal() as session:
+            return await MessageRecipientRepository(session).list_sent_keys(list(keys))
+
+    def _remember_sent(self, payload: dict[str, Any]) -> None:
+        idempotency_key = payload.get("idempotency_key")
+        if idempotency_key:
+            self.sent_keys.set(idempotency_key)
+
+    def _retry_count(self, message: aio_pika.IncomingMessage) -> int:
+        try:
+            return int((message.headers or {}).get(RETRY_COUNT_HEADER, 0))
+        except (TypeError, ValueError):
+            return 0
+
+    def _should_retry(self, exc: Exception, retry_count: int) -> bool:
+        return retry_count < settings.META_RETRY_MAX_ATTEMPTS and self._is_retryable(exc)
+
+    def _is_retryable(self, exc: Exception) -> bool:
+        # Falhas transitorias (rede, timeout, throttling, 5xx) voltam via filas de atraso;
+        # payload invalido, 4xx e demais erros sao permanentes e seguem para o backup.
+        if isinstance(exc, (MetaThrottledError, httpx.TransportError)):
+            return True
+        if isinstance(exc, httpx.HTTPStatusError):
+            status_code = exc.response.status_code
+            return status_code >= 500 or status_code in {408, 429}
+        return False
+
+    async def _publish_retry(self, queue_name: str, payload: dict[str, Any], retry_count: int) -> None:
+        delays = settings.META_RETRY_DELAYS_SECONDS
+        delay_seconds = delays[min(retry_count, len(delays)) - 1]
+        delay_queue = await self.rabbitmq_client.ensure_delay_queue(queue_name, delay_seconds)
+        await self.rabbitmq_client.publish(
+            delay_queue,
+            payload,
+            headers={RETRY_COUNT_HEADER: retry_count},
+        )
 
     def _build_meta_payload(self, queue_name: str, payload: dict[str, Any]) -> dict[str, Any]:
         build_payload = self.queue_handlers.get(queue_name)
@@ -86,51 +399,36 @@ class MetaQueueWorker:
         if not isinstance(messages, list) or not messages:
             raise ValueError("Retorno da Meta sem confirmacao de mensagem enviada.")
 
-    async def _register_delivery_success(self, payload: dict[str, Any]) -> None:
+    def _register_delivery_success(self, payload: dict[str, Any], meta_response: dict[str, Any]) -> None:
         message_request_id = payload.get("message_request_id")
         if message_request_id is None:
             logger.warning("Payload sem message_request_id; contabilizacao ignorada.")
             return
+        self.delivery_counter.increment(int(message_request_id))
+        first_message = meta_response["messages"][0]
+        self._register_recipient_outcome(
+            payload,
+            "sent",
+            meta_message_id=first_message.get("id") if isinstance(first_message, dict) else None,
+        )
 
-        request_id = int(message_request_id)
-        lock = self._request_locks.setdefault(request_id, asyncio.Lock())
-        async with lock:
-            sent_messages = self._delivered_counter_by_request.get(request_id, 0) + 1
-            self._delivered_counter_by_request[request_id] = sent_messages
-
-            session = db_client.SessionLocal()
-            try:
-                request = session.get(MessageRequest, request_id)
-                if request is None:
-                    logger.warning(
-                        "MessageRequest nao encontrado para id=%s; contabilizacao ignorada.",
-                        request_id,
-                    )
-                    self._delivered_counter_by_request.pop(request_id, None)
-                    self._request_locks.pop(request_id, None)
-                    return
-
-                if request.published_messages <= 0:
-                    return
-
-                if sent_messages < request.published_messages:
-                    return
-
-                session.execute(
-                    update(MessageRequest)
-                    .where(MessageRequest.id == request_id)
-                    .values(send_messages=sent_messages, status="finish")
-                )
-                session.commit()
-                self._delivered_counter_by_request.pop(request_id, None)
-                self._request_locks.pop(request_id, None)
-                logger.info(
-                    "Fluxo finalizado com sucesso. message_request_id=%s send_messages=%s status=finish",
-                    request_id,
-                    sent_messages,
-                )
-            finally:
-                session.close()
+    def _register_recipient_outcome(
+        self,
+        payload: dict[str, Any] | None,
+        status: str,
+        meta_message_id: str | None = None,
+        error: str | None = None,
+    ) -> None:
+        # Payloads antigos (sem row_index) nao tem linha em message_recipients.
+        if not payload or payload.get("message_request_id") is None or payload.get("row_index") is None:
+            return
+        self.delivery_counter.record_outcome(
+            int(payload["message_request_id"]),
+            int(payload["row_index"]),
+            status,
+            meta_message_id=meta_message_id,
+            error=error,
+        )
 
     def _build_folha_ponto_ativos_meta_payload(self, payload: dict[str, Any]) -> dict[str, Any]:
         return self._build_folha_ponto_meta_payload(payload, template_name="folha_ponto_ativo")
@@ -155,18 +453,11 @@ class MetaQueueWorker:
                 "Payload invalido para folha_ponto: esperado whatsapp_number, name e month_folha_ponto."
             )
 
+        # body_parameters: o MetaRequestService preenche o esqueleto pre-serializado do template.
         return {
             "whatsapp_number": str(whatsapp_number),
             "template_name": template_name,
-            "components": [
-                {
-                    "type": "body",
-                    "parameters": [
-                        {"type": "text", "text": str(name)},
-                        {"type": "text", "text": str(month_folha_ponto)},
-                    ],
-                }
-            ],
+            "body_parameters": [str(name), str(month_folha_ponto)],
         }
 
     def _build_vagas_meta_payload(self, payload: dict[str, Any]) -> dict[str, Any]:
@@ -175,18 +466,20 @@ class MetaQueueWorker:
             raise ValueError("Payload invalido para vagas: esperado whatsapp_number.")
 
         template_name = str(payload.get("template_type") or "vagas")
-        ignored_keys = {"whatsapp_number", "template_type", "user_id", "message_request_id"}
-        parameters = [
-            {"type": "text", "text": str(value)}
-            for key, value in payload.items()
-            if key not in ignored_keys
-        ]
-        components = [{"type": "body", "parameters": parameters}] if parameters else []
+        ignored_keys = {
+            "whatsapp_number",
+            "template_type",
+            "user_id",
+            "message_request_id",
+            "row_index",
+            "idempotency_key",
+        }
+        parameters = [str(value) for key, value in payload.items() if key not in ignored_keys]
 
         return {
             "whatsapp_number": str(whatsapp_number),
             "template_name": template_name,
-            "components": components,
+            "body_parameters": parameters,
         }
 
     async def _publish_backup(
@@ -195,6 +488,7 @@ class MetaQueueWorker:
         payload: dict[str, Any] | None,
         raw_body: bytes,
         error: str,
+        retry_count: int = 0,
     ) -> None:
         backup_payload: dict[str, Any]
         if payload is None:
@@ -202,20 +496,37 @@ class MetaQueueWorker:
                 "source_queue": queue_name,
                 "raw_body": raw_body.decode(errors="ignore"),
                 "error": error,
+                "retry_count": retry_count,
             }
         else:
-            backup_payload = {**payload, "source_queue": queue_name, "error": error}
+            backup_payload = {
+                **payload,
+                "source_queue": queue_name,
+                "error": error,
+                "retry_count": retry_count,
+            }
 
         await self.rabbitmq_client.publish(settings.RABBITMQ_QUEUE_FOLHA_PONTO_BACKUP, backup_payload)
+        WORKER_BACKUP_MESSAGES.labels(queue_name).inc()
         logger.warning(
             "Mensagem movida para fila de backup '%s'",
             settings.RABBITMQ_QUEUE_FOLHA_PONTO_BACKUP,
         )
 
 
-async def main() -> None:
-    worker = MetaQueueWorker()
-    await worker.start()
+async def main(
+    queue_names: Sequence[str] | None = None,
+    metrics_port: int | None = None,
+    max_rate: float | None = None,
+) -> None:
+    worker = MetaQueueWorker(queue_names=queue_names, metrics_port=metrics_port, max_rate=max_rate)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.request_shutdown)
+    try:
+        await worker.start()
+    finally:
+        await db_client.dispose()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+import asyncio
+import multiprocessing
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+
+from app.core.logger import get_logger, setup_logging
+from app.core.settings import settings
+from app.workers import meta_queue_worker
+
+setup_logging()
+logger = get_logger(__name__)
+
+# Folga apos WORKER_SHUTDOWN_GRACE_SECONDS para o flush final dos contadores e o
+# fechamento das conexoes antes do SIGKILL.
+_SHUTDOWN_MARGIN_SECONDS = 10.0
+_POLL_SECONDS = 1.0
+
+
+@dataclass
+class WorkerSlot:
+    index: int
+    queue_names: list[str]
+    process: BaseProcess | None = None
+    started_at: float = 0.0
+    failures: int = 0
+    restart_at: float = 0.0
+
+
+class WorkerSupervisor:
+    # Processo pai sem event loop: inicia um MetaQueueWorker por slot (spawn), reinicia
+    # os que caem com backoff exponencial e, no SIGTERM/SIGINT, repassa o SIGTERM para
+    # que cada filho pare de consumir, termine os envios, grave os contadores e saia.
+    def __init__(
+        self,
+        assignment: list[list[str]],
+        metrics_port: int,
+        max_rate: float,
+        grace_seconds: float,
+        max_backoff_seconds: float,
+    ):
+        self.slots = [WorkerSlot(index, queue_names) for index, queue_names in enumerate(assignment)]
+        self.metrics_port = metrics_port
+        self.max_rate = max_rate
+        self.grace_seconds = grace_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        for slot in self.slots:
+            self._start(slot)
+
+        while not self._stopping:
+            sentinels = [slot.process.sentinel for slot in self.slots if slot.process is not None]
+            wait(sentinels, timeout=_POLL_SECONDS)
+            if not self._stopping:
+                self._restart_exited()
+
+        self._stop_children()
+
+    def _handle_signal(self, signum: int, _frame) -> None:
+        if not self._stopping:
+            logger.info("Supervisor recebeu %s; encerrando workers", signal.Signals(signum).name)
+        self._stopping = True
+
+    def _start(self, slot: WorkerSlot) -> None:
+        metrics_port = self.metrics_port + slot.index if self.metrics_port > 0 else 0
+        process = self._context.Process(
+            target=_run_worker,
+            args=(slot.queue_names, metrics_port, self.max_rate),
+            name=f"meta-queue-worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        logger.info(
+            "Worker %s iniciado (pid=%s, filas=%s, metricas=%s)",
+            slot.index,
+            process.pid,
+            ",".join(slot.queue_names),
+            metrics_port or "desativadas",
+        )
+
+    def _restart_exited(self) -> None:
+        now = time.monotonic()
+        for slot in self.slots:
+            process = slot.process
+            if process is not None and not process.is_alive():
+                process.join()
+                uptime = now - slot.started_at
+                # Um processo que ficou de pe por mais que o backoff maximo zera a contagem.
+                slot.failures = 1 if uptime >= self.max_backoff_seconds else slot.failures + 1
+                delay = min(self.max_backoff_seconds, 2 ** (slot.failures - 1))
+                logger.error(
+                    "Worker %s (pid=%s) encerrou com codigo %s apos %.0fs; reiniciando em %.0fs",
+                    slot.index,
+                    process.pid,
+                    process.exitcode,
+                    uptime,
+                    delay,
+                )
+                process.close()
+                slot.process = None
+                slot.restart_at = now + delay
+            if slot.process is None and now >= slot.restart_at:
+                self._start(slot)
+
+    def _stop_children(self) -> None:
+        running = [slot.process for slot in self.slots if slot.process is not None and slot.process.is_alive()]
+        for process in running:
+            process.terminate()
+
+        deadline = time.monotonic() + self.grace_seconds + _SHUTDOWN_MARGIN_SECONDS
+        for process in running:
+            process.join(timeout=max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error("Worker pid=%s nao encerrou no prazo; enviando SIGKILL", process.pid)
+                process.kill()
+                process.join()
+        logger.info("Supervisor encerrado")
+
+
+def resolve_assignment(processes: int, assignment: list[list[str]]) -> list[list[str]]:
+    # Valida antes de iniciar os filhos: uma fila desconhecida derrubaria o processo
+    # em loop de reinicio.
+    known = meta_queue_worker.worker_queue_names()
+    if not assignment:
+        return [list(known) for _ in range(max(1, processes))]
+
+    for queue_names in assignment:
+        if not queue_names:
+            raise ValueError("WORKER_QUEUE_ASSIGNMENT contem um processo sem filas")
+        unknown = [queue_name for queue_name in queue_names if queue_name not in known]
+        if unknown:
+            raise ValueError(f"Fila sem handler configurado: {', '.join(unknown)}")
+    return [list(queue_names) for queue_names in assignment]
+
+
+def _run_worker(queue_names: list[str], metrics_port: int, max_rate: float) -> None:
+    asyncio.run(meta_queue_worker.main(queue_names, metrics_port=metrics_port, max_rate=max_rate))
+
+
+def main() -> None:
+    assignment = resolve_assignment(settings.WORKER_PROCESSES, settings.WORKER_QUEUE_ASSIGNMENT)
+    # O limite da Meta vale para o numero de telefone: cada processo usa uma fracao.
+    max_rate = max(
+        settings.META_RATE_LIMIT_MIN_PER_SECOND,
+        settings.META_RATE_LIMIT_PER_SECOND / len(assignment),
+    )
+    WorkerSupervisor(
+        assignment,
+        metrics_port=settings.METRICS_WORKER_PORT,
+        max_rate=max_rate,
+        grace_seconds=settings.WORKER_SHUTDOWN_GRACE_SECONDS,
+        max_backoff_seconds=settings.WORKER_RESTART_MAX_BACKOFF_SECONDS,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""Ingestao de planilhas de folha ponto: parse, montagem, publicacao e fluxo completo.
+
+Gera planilhas sinteticas (cacheadas em --data-dir) com as colunas Nome,
+Mes e Contato entre outras colunas da folha, telefones como float (como o
+Excel entrega), com DDI 55, formatados com mascara, e linhas lixo: vazias,
+sem contato, texto no lugar do numero, numeros curtos e repetidos. Com
+--format, as mesmas linhas saem em xlsx, csv (";" e cp1252, como exportado
+pelo Excel em pt-BR) ou parquet (contato como texto).
+
+Fases medidas separadamente, na ordem do pipeline:
+- parse: parse_pool.stream_rows (pool de processos, blocos de XLSX_STREAM_CHUNK_SIZE).
+- build: build_folha_ponto_payloads + split_valid_payloads por bloco.
+- publish: publish_many por bloco no publicador escolhido.
+- e2e: FolhaPontoAtivosService.loop_folha_ponto_ativos real, com o banco de
+  DATABASE_URL (message_requests + COPY/insert em message_recipients) e o mesmo
+  publicador. Os registros criados sao removidos ao final; --no-e2e pula a fase.
+- dataframe (com --dataframe, so xlsx): pd.read_excel da planilha inteira, o caminho antigo via pandas.
+
+Publicador: noop (padrao) monta e serializa as mensagens AMQP como o cliente
+real, mas nao envia; amqp publica no RabbitMQ de RABBITMQ_URL (fila dedicada).
+
+Reporta linhas/s e pico de RSS (processo principal apos cada fase; o parse roda
+nos processos do pool, medidos ao final) e grava o resultado em
+benchmarks/results/bench_ingestion.jsonl. Os tamanhos rodam em ordem crescente
+no mesmo processo, entao o pico de RSS de cada tamanho inclui os anteriores.
+
+Uso:
+    python -m benchmarks.bench_ingestion
+    python -m benchmarks.bench_ingestion --rows 1000 100000 1000000 --no-e2e
+    python -m benchmarks.bench_ingestion --rows 100000 --publisher amqp --dataframe
+    python -m benchmarks.bench_ingestion --rows 100000 --format csv --no-e2e
+"""
+
+import argparse
+import asyncio
+import csv
+import multiprocessing
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+from sqlalchemy import delete
+
+from app.core.settings import settings
+from app.infra.db.db_client import db_client
+from app.infra.db.models import MessageRecipient, MessageRequest, User
+from app.infra.rabbitmq.rabbitmq_client import RabbitMQ
+from app.services.folha_ponto_ativos_service import FolhaPontoAtivosService
+from app.utils.parse_pool import parse_pool
+from app.utils.payload_utils import build_folha_ponto_payloads, split_valid_payloads
+from benchmarks.results import peak_rss_mb, print_comparison, record_result
+
+BENCHMARK_NAME = "bench_ingestion"
+DEFAULT_ROWS = (1_000, 10_000, 100_000)
+FORMATS = ("xlsx", "csv", "parquet")
+HEADER = ("Matricula", "Nome", "Setor", "Mes", "Contato", "Admissao")
+COLUMNS = ("Nome", "Mes", "Contato")
+BENCH_USER = "bench_ingestion_user"
+TEMPLATE_TYPE = "FP"
+
+
+class NoopPublisher(RabbitMQ):
+    # Cliente real (envelopes, codec, aio_pika.Message, janelas) sem conexao com o broker.
+    async def ensure_queue(self, queue_name: str, arguments: dict[str, Any] | None = None) -> None:
+        return None
+
+    async def _publish_confirmed(self, message, queue_name: str, confirm_seconds) -> None:
+        return None
+
+    async def close(self) -> None:
+        return None
+
+
+def contact_value(rng: random.Random, index: int, previous: list[float]) -> Any:
+    # Distribuicao aproximada das planilhas reais: maioria float, o resto sujo.
+    number = 41_900_000_000 + rng.randrange(99_999_999)
+    draw = rng.random()
+    if draw < 0.02:
+        return None
+    if draw < 0.03:
+        return "sem telefone"
+    if draw < 0.04:
+        return float(rng.randrange(10_000, 99_999_999))
+    if draw < 0.06 and previous:
+        return rng.choice(previous)
+    if draw < 0.16:
+        return float(5_500_000_000_000 + number)
+    if draw < 0.26:
+        digits = str(number)
+        return f"({digits[:2]}) {digits[2:7]}-{digits[7:]}"
+    value = float(number)
+    if len(previous) < 1_000:
+        previous.append(value)
+    return value
+
+
+def synthetic_rows(rows: int, seed: int) -> Iterator[tuple[Any, ...]]:
+    rng = random.Random(seed)
+    previous: list[float] = []
+    for index in range(rows):
+        if rng.random() < 0.02:
+            # Linha vazia com formatacao residual (o parser descarta).
+            yield (None,) * len(HEADER)
+            continue
+        yield (
+            100_000 + index,
+            f"  Colaborador {index} da Silva ",
+            rng.choice(("Operacao", "Torre", "Administrativo", None)),
+            "01/2026",
+            contact_value(rng, index, previous),
+            f"2019-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+        )
+
+
+def generate_workbook(path: Path, rows: int, seed: int) -> None:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Folha")
+    sheet.append(HEADER)
+    for row in synthetic_rows(rows, seed):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def generate_csv(path: Path, rows: int, seed: int) -> None:
+    with path.open("w", newline="", encoding="cp1252") as target:
+        writer = csv.writer(target, delimiter=";")
+        writer.writerow(HEADER)
+        writer.writerows(synthetic_rows(rows, seed))
+
+
+def generate_parquet(path: Path, rows: int, seed: int) -> None:
+    # Colunas tipadas como num export de data lake; o contato misto vira texto.
+    columns = list(zip(*synthetic_rows(rows, seed)))
+    contact_index = HEADER.index("Contato")
+    columns[contact_index] = [None if value is None else str(value) for value in columns[contact_index]]
+    pq.write_table(pa.table(dict(zip(HEADER, columns))), path)
+
+
+GENERATORS = {"xlsx": generate_workbook, "csv": generate_csv, "parquet": generate_parquet}
+
+
+def workbook_path(data_dir: Path, rows: int, seed: int, file_format: str = "xlsx") -> Path:
+    path = data_dir / f"folha_ponto_{rows}_{seed}.{file_format}"
+    if not path.exists():
+        started = time.perf_counter()
+        data_dir.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(f".partial.{file_format}")
+        GENERATORS[file_format](partial, rows, seed)
+        partial.rename(path)
+        print(f"planilha gerada: {path} ({time.perf_counter() - started:.1f}s)")
+    return path
+
+
+def make_publisher(kind: str) -> RabbitMQ:
+    return RabbitMQ() if kind == "amqp" else NoopPublisher()
+
+
+async def parse_phase(path: Path) -> list[list[tuple[Any, ...]]]:
+    return [chunk async for chunk in parse_pool.stream_rows(path, COLUMNS)]
+
+
+def build_phase(chunks: list[list[tuple[Any, ...]]]) -> list[list[dict[str, Any]]]:
+    seen_keys: set[str] = set()
+    batches = []
+    for chunk in chunks:
+        row_numbers, names, months, contacts = zip(*chunk)
+        payloads = build_folha_ponto_payloads(
+            names,
+            months,
+            contacts,
+            user_id=1,
+            template_type=TEMPLATE_TYPE,
+            message_request_id=1,
+            row_indexes=row_numbers,
+        )
+        payloads, _ = split_valid_payloads(payloads, contacts, seen_keys)
+        batches.append(payloads)
+    return batches
+
+
+async def publish_phase(publisher: RabbitMQ, batches: list[list[dict[str, Any]]]) -> int:
+    published = 0
+    for payloads in batches:
+        published += await publisher.publish_many(settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS, payloads)
+    return published
+
+
+async def bench_user_id() -> int:
+    async with db_client.AsyncSessionLocal() as session:
+        user = User(name=BENCH_USER, password="-", setor="bench")
+        session.add(user)
+        await session.commit()
+        return user.id
+
+
+async def e2e_phase(path: Path, publisher: RabbitMQ, user_id: int) -> int:
+    async with db_client.AsyncSessionLocal() as session:
+        request = MessageRequest(
+            user_id=user_id,
+            published_messages=0,
+            send_messages=0,
+            parsed_rows=0,
+            rejected_rows=0,
+            status="parsing",
+            template_type=TEMPLATE_TYPE,
+        )
+        session.add(request)
+        await session.commit()
+        service = FolhaPontoAtivosService(session=session)
+        service.rabbitmq_client = publisher
+        try:
+            await service.loop_folha_ponto_ativos(
+                message_request_id=request.id,
+                file=path,
+                column_name=COLUMNS[0],
+                column_month=COLUMNS[1],
+                column_contact=COLUMNS[2],
+                user_id=user_id,
+                template_type=TEMPLATE_TYPE,
+            )
+            return request.parsed_rows
+        finally:
+            await session.rollback()
+            await session.execute(delete(MessageRecipient).where(MessageRecipient.message_request_id == request.id))
+            await session.execute(delete(MessageRequest).where(MessageRequest.id == request.id))
+            await session.commit()
+
+
+async def remove_bench_user(user_id: int) -> None:
+    async with db_client.AsyncSessionLocal() as session:
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.commit()
+
+
+async def run_size(args: argparse.Namespace, rows: int, user_id: int | None) -> dict[str, float]:
+    path = workbook_path(args.data_dir, rows, args.seed, args.format)
+    publisher = make_publisher(args.publisher)
+    metrics: dict[str, float] = {}
+
+    def measure(phase: str, started: float, processed_rows: int) -> None:
+        elapsed = time.perf_counter() - started
+        metrics[f"{phase}_s"] = elapsed
+        metrics[f"{phase}_rows_per_sec"] = processed_rows / elapsed if elapsed else 0.0
+        metrics[f"{phase}_peak_rss_mb"] = peak_rss_mb()
+
+    try:
+        started = time.perf_counter()
+        chunks = await parse_phase(path)
+        parsed_rows = sum(len(chunk) for chunk in chunks)
+        measure("parse", started, parsed_rows)
+
+        started = time.perf_counter()
+        batches = build_phase(chunks)
+        measure("build", started, parsed_rows)
+        del chunks
+
+        started = time.perf_counter()
+        published = await publish_phase(publisher, batches)
+        measure("publish", started, published)
+        del batches
+
+        if user_id is not None:
+            started = time.perf_counter()
+            e2e_rows = await e2e_phase(path, publisher, user_id)
+            measure("e2e", started, e2e_rows)
+
+        if args.dataframe:
+            started = time.perf_counter()
+            dataframe = await asyncio.to_thread(pd.read_excel, path, engine="openpyxl")
+            measure("dataframe", started, len(dataframe))
+            del dataframe
+    finally:
+        await publisher.close()
+
+    metrics["parsed_rows"] = parsed_rows
+    metrics["published"] = published
+    return metrics
+
+
+def parse_workers_peak_rss_mb() -> float:
+    # Os processos do pool so entram na conta depois de encerrados e coletados.
+    parse_pool.shutdown()
+    for child in multiprocessing.active_children():
+        child.join(timeout=10)
+    return peak_rss_mb(children=True)
+
+
+async def run(args: argparse.Namespace) -> dict[int, dict[str, float]]:
+    # Aquece o pool (spawn + imports nos processos), como na API ja iniciada.
+    parse_pool.start()
+    await parse_phase(workbook_path(args.data_dir, min(args.rows), args.seed, args.format))
+    user_id = None
+    if args.e2e:
+        db_client.create_tables()
+        user_id = await bench_user_id()
+    try:
+        return {rows: await run_size(args, rows, user_id) for rows in sorted(args.rows)}
+    finally:
+        if user_id is not None:
+            await remove_bench_user(user_id)
+        await db_client.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--format", choices=FORMATS, default="xlsx")
+    parser.add_argument("--publisher", choices=("noop", "amqp"), default="noop")
+    parser.add_argument("--no-e2e", dest="e2e", action="store_false")
+    parser.add_argument("--dataframe", action="store_true", help="mede tambem a leitura via pandas (pd.read_excel)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "bench_ingestion")
+    parser.add_argument("--no-save", action="store_true", help="nao grava o resultado no historico")
+    args = parser.parse_args()
+    if args.dataframe and args.format != "xlsx":
+        parser.error("--dataframe so se aplica a --format xlsx")
+
+    results = asyncio.run(run(args))
+    workers_peak = parse_workers_peak_rss_mb()
+
+    phases = ["parse", "build", "publish", "e2e", "dataframe"]
+    for rows, metrics in results.items():
+        metrics["parse_workers_peak_rss_mb"] = workers_peak
+        print(
+            f"\n{rows} linhas geradas ({args.format}): {int(metrics['parsed_rows'])} lidas, "
+            f"{int(metrics['published'])} publicadas ({args.publisher})"
+        )
+        print(f"{'fase':<10} {'s':>8} {'linhas/s':>12} {'RSS pico MiB':>13}")
+        for phase in phases:
+            if f"{phase}_s" not in metrics:
+                continue
+            print(
+                f"{phase:<10} {metrics[f'{phase}_s']:>8.2f} "
+                f"{metrics[f'{phase}_rows_per_sec']:>12.0f} {metrics[f'{phase}_peak_rss_mb']:>13.1f}"
+            )
+        if not args.no_save:
+            params = {
+                "rows": rows,
+                "format": args.format,
+                "publisher": args.publisher,
+                "e2e": args.e2e,
+                "dataframe": args.dataframe,
+                "seed": args.seed,
+                "chunk_size": settings.XLSX_STREAM_CHUNK_SIZE,
+                "parse_workers": settings.XLSX_PARSE_MAX_WORKERS,
+                "content_type": settings.RABBITMQ_CONTENT_TYPE,
+                "batch_size": settings.RABBITMQ_PUBLISH_BATCH_SIZE,
+                "database": db_client.async_engine.dialect.name if args.e2e else None,
+            }
+            print_comparison(record_result(BENCHMARK_NAME, params, metrics), metrics)
+    print(f"\npico de RSS dos processos de parse: {workers_peak:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Carga de login: vazao do /authenticate e latencia do /health durante a rajada.
+
+Sobe a aplicacao em processo (httpx.ASGITransport, sem rede) contra o banco do
+DATABASE_URL configurado, cria um usuario de teste e dispara logins concorrentes.
+Em paralelo mede a latencia do /health, que nao deve degradar enquanto o bcrypt
+roda no pool dedicado (PASSWORD_HASH_MAX_WORKERS / PASSWORD_HASH_MAX_PENDING).
+Com --legacy-hash o usuario e gravado com bcrypt puro (esquema deprecated) para
+exercitar a atualizacao de hash em background.
+
+Uso:
+    python -m benchmarks.bench_login
+    python -m benchmarks.bench_login --requests 400 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from app.core.security import pwd_context
+from app.infra.db.db_client import db_client
+from app.infra.db.models import User
+from app.main import app
+from benchmarks.results import percentile
+
+BENCH_USER = "bench_login_user"
+BENCH_PASSWORD = "bench-password"
+HEALTH_INTERVAL_SECONDS = 0.05
+
+
+def prepare_user(legacy_hash: bool) -> None:
+    db_client.create_tables()
+    scheme = "bcrypt" if legacy_hash else "bcrypt_sha256"
+    with db_client.SessionLocal() as session:
+        session.query(User).filter(User.name == BENCH_USER).delete()
+        session.add(
+            User(name=BENCH_USER, password=pwd_context.hash(BENCH_PASSWORD, scheme=scheme), setor="bench")
+        )
+        session.commit()
+
+
+async def run(requests: int, concurrency: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        statuses: Counter[int] = Counter()
+        login_latencies: list[float] = []
+        health_latencies: list[float] = []
+        done = asyncio.Event()
+
+        async def login() -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/authenticate",
+                    json={"name": BENCH_USER, "password": BENCH_PASSWORD},
+                )
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    login_latencies.append(time.perf_counter() - started)
+
+        async def probe_health() -> None:
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/v1/health")
+                health_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(HEALTH_INTERVAL_SECONDS)
+
+        probe = asyncio.create_task(probe_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+
+    ok = statuses.get(200, 0)
+    print(f"logins: {requests} em {elapsed:.2f}s (concorrencia {concurrency})")
+    print(f"status: {dict(sorted(statuses.items()))}")
+    print(f"vazao: {ok / elapsed:.1f} logins/s")
+    if login_latencies:
+        print(
+            "latencia login (s): "
+            f"p50={statistics.median(login_latencies):.3f} p95={percentile(login_latencies, 0.95):.3f}"
+        )
+    if health_latencies:
+        print(
+            "latencia /health durante a carga (ms): "
+            f"p50={statistics.median(health_latencies) * 1000:.1f} "
+            f"p95={percentile(health_latencies, 0.95) * 1000:.1f} "
+            f"max={max(health_latencies) * 1000:.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--legacy-hash", action="store_true")
+    args = parser.parse_args()
+
+    prepare_user(args.legacy_hash)
+    asyncio.run(run(args.requests, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Custo de CPU por mensagem no caminho fila -> Meta, antes e depois dos codecs/esqueletos.
+
+Cada mensagem passa por: serializacao no publish, desserializacao no worker,
+montagem do payload da Meta e serializacao do corpo da requisicao (o mesmo
+json.dumps que o httpx faz com json=). A montagem do httpx.Request e o envio
+ficam de fora: custam o mesmo nos dois caminhos.
+
+Uso:
+    python -m benchmarks.bench_message_codec
+    python -m benchmarks.bench_message_codec --messages 200000
+"""
+
+import argparse
+import json
+import time
+from typing import Any
+
+from app.infra.rabbitmq.codecs import CODECS, JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE, JsonCodec
+from app.services.meta_request_service import MetaTemplateSkeleton
+
+DEFAULT_MESSAGES = 100_000
+
+
+def make_payloads(messages: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "name": f"Colaborador {index}",
+            "month_folha_ponto": "01/2026",
+            "whatsapp_number": str(41_900_000_000 + index),
+            "user_id": 1,
+            "template_type": "FP",
+            "message_request_id": 1,
+            "idempotency_key": f"1:{41_900_000_000 + index}",
+            "row_index": index + 2,
+        }
+        for index in range(messages)
+    ]
+
+
+def legacy_path(payload: dict[str, Any]) -> bytes:
+    # Copia do caminho antigo: json.dumps/json.loads, components aninhados e httpx json=.
+    body = json.dumps(payload).encode()
+    decoded = json.loads(body.decode())
+    request_body = {
+        "messaging_product": "whatsapp",
+        "to": f"55{decoded['whatsapp_number']}",
+        "type": "template",
+        "template": {
+            "name": "folha_ponto_ativo",
+            "language": {"code": "pt_BR"},
+            "components": [
+                {
+                    "type": "body",
+                    "parameters": [
+                        {"type": "text", "text": str(decoded["name"])},
+                        {"type": "text", "text": str(decoded["month_folha_ponto"])},
+                    ],
+                }
+            ],
+        },
+    }
+    return json.dumps(request_body, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode()
+
+
+def make_current_path(codec, skeleton: MetaTemplateSkeleton):
+    def current_path(payload: dict[str, Any]) -> bytes:
+        decoded = codec.decode(codec.encode(payload))
+        return skeleton.render(
+            decoded["whatsapp_number"],
+            [str(decoded["name"]), str(decoded["month_folha_ponto"])],
+        )
+
+    return current_path
+
+
+def per_message_us(func, payloads: list[dict[str, Any]]) -> float:
+    started = time.perf_counter()
+    for payload in payloads:
+        func(payload)
+    return (time.perf_counter() - started) / len(payloads) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=DEFAULT_MESSAGES)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.messages)
+    skeleton = MetaTemplateSkeleton("folha_ponto_ativo")
+    variants = [("antes (json + dicts aninhados)", legacy_path)]
+    variants.append(("json stdlib + esqueleto", make_current_path(JsonCodec(), skeleton)))
+    if not isinstance(CODECS[JSON_CONTENT_TYPE], JsonCodec):
+        variants.append(("orjson + esqueleto", make_current_path(CODECS[JSON_CONTENT_TYPE], skeleton)))
+    if MSGPACK_CONTENT_TYPE in CODECS:
+        variants.append(("msgpack + esqueleto", make_current_path(CODECS[MSGPACK_CONTENT_TYPE], skeleton)))
+
+    baseline = None
+    print(f"{args.messages} mensagens")
+    print(f"{'caminho':<32} {'us/msg':>8} {'ganho':>8}")
+    for label, func in variants:
+        cost = per_message_us(func, payloads)
+        baseline = baseline or cost
+        print(f"{label:<32} {cost:>8.2f} {baseline / cost:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compara a montagem de payloads via df.iterrows() com o builder por colunas.
+
+Uso:
+    python -m benchmarks.bench_payload_builder
+    python -m benchmarks.bench_payload_builder --sizes 10000 100000
+"""
+
+import argparse
+import random
+import time
+from typing import Any
+
+import pandas as pd
+
+from app.utils.payload_utils import build_folha_ponto_payloads
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def make_dataframe(rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = random.Random(seed)
+    return pd.DataFrame(
+        {
+            "Nome": [f" Colaborador {index} " for index in range(rows)],
+            "Mes": ["01/2026"] * rows,
+            # Telefones chegam do Excel como float, como nas planilhas reais.
+            "Contato": [float(41_900_000_000 + rng.randrange(99_999_999)) for _ in range(rows)],
+        }
+    )
+
+
+def iterrows_payloads(df: pd.DataFrame) -> list[dict[str, Any]]:
+    # Copia do loop antigo de FolhaPontoAtivosService.loop_folha_ponto_ativos.
+    payloads = []
+    for _, row in df.iterrows():
+        payloads.append(
+            {
+                "name": str(row["Nome"]),
+                "month_folha_ponto": str(row["Mes"]),
+                "whatsapp_number": str(row["Contato"]),
+                "user_id": 1,
+                "template_type": "FP",
+                "message_request_id": 1,
+            }
+        )
+    return payloads
+
+
+def columnar_payloads(df: pd.DataFrame) -> list[dict[str, Any]]:
+    return build_folha_ponto_payloads(
+        df["Nome"],
+        df["Mes"],
+        df["Contato"],
+        user_id=1,
+        template_type="FP",
+        message_request_id=1,
+    )
+
+
+def timed(func, df: pd.DataFrame) -> float:
+    started = time.perf_counter()
+    func(df)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} {'iterrows (s)':>14} {'colunas (s)':>13} {'ganho':>8}")
+    for rows in args.sizes:
+        df = make_dataframe(rows)
+        legacy = timed(iterrows_payloads, df)
+        columnar = timed(columnar_payloads, df)
+        print(f"{rows:>10} {legacy:>14.3f} {columnar:>13.3f} {legacy / columnar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
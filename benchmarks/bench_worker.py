@@ -0,0 +1,411 @@
+"""Vazao ponta a ponta do MetaQueueWorker contra uma Meta falsa local.
+
+O worker real (decodificacao, idempotencia, limitador de taxa, httpx, retries,
+backup e agregador de contadores) drena N mensagens da fila de folha ponto
+ativos. A Meta e o servidor de benchmarks/fake_meta.py em outro processo, com
+latencia, erros 500 e throttling (429) configuraveis. O broker e:
+
+- stand-in (padrao): fila em memoria no mesmo processo, com a interface do
+  cliente RabbitMQ usada pelo worker; filas de atraso reentregam apos
+  delay * --retry-delay-scale (0 = imediato).
+- amqp: o RabbitMQ de RABBITMQ_URL (ex.: container local). A fila de folha
+  ponto ativos deve ser dedicada ao benchmark: as mensagens sao publicadas
+  antes e o worker drena ate a fila e as filas de atraso ficarem vazias.
+
+Sem --db, o banco fica fora da medicao: o agregador acumula os contadores mas
+nao grava, e reentregas nao consultam message_recipients.
+
+Reporta msgs/s (destinatarios), latencia p50/p99 por mensagem AMQP (da entrega
+ao ack/nack) e pico de RSS do processo do worker, e grava o resultado em
+benchmarks/results/bench_worker.jsonl para comparar entre commits.
+
+Uso:
+    python -m benchmarks.bench_worker
+    python -m benchmarks.bench_worker --messages 20000 --concurrency 64 --latency-ms 80
+    python -m benchmarks.bench_worker --error-rate 0.01 --throttle-rate 0.02
+    python -m benchmarks.bench_worker --broker amqp --batch-size 10
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from collections import defaultdict
+from typing import Any
+
+from app.core.settings import settings
+from app.infra.rabbitmq.codecs import get_codec
+from app.infra.rabbitmq.rabbitmq_client import BATCH_ENVELOPE_KEY, RabbitMQ
+from app.workers.delivery_counter import DeliveryCounterAggregator
+from app.workers.meta_queue_worker import MetaQueueWorker
+from benchmarks.fake_meta import FakeMetaConfig, start_in_process
+from benchmarks.results import peak_rss_mb, percentile, print_comparison, record_result
+
+BENCHMARK_NAME = "bench_worker"
+UNLIMITED_RATE = 1_000_000_000.0
+AMQP_POLL_SECONDS = 0.2
+
+
+class StandInMessage:
+    def __init__(
+        self,
+        broker: "StandInBroker",
+        queue_name: str,
+        body: bytes,
+        headers: dict[str, Any] | None,
+        redelivered: bool,
+    ):
+        self.broker = broker
+        self.queue_name = queue_name
+        self.body = body
+        self.content_type = broker.codec.content_type
+        self.headers = headers
+        self.redelivered = redelivered
+
+    async def ack(self) -> None:
+        self.broker.settle()
+
+    async def nack(self, requeue: bool = True) -> None:
+        if requeue:
+            self.broker.enqueue(self.queue_name, self.body, self.headers, redelivered=True)
+        self.broker.settle()
+
+
+class StandInQueue:
+    def __init__(self):
+        self.messages: asyncio.Queue[StandInMessage] = asyncio.Queue()
+        self.closed = False
+
+    def iterator(self) -> "StandInQueue":
+        return self
+
+    async def __aenter__(self) -> "StandInQueue":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        return None
+
+    def __aiter__(self) -> "StandInQueue":
+        return self
+
+    async def __anext__(self) -> StandInMessage:
+        if not self.closed:
+            message = await self.messages.get()
+            if not self.closed:
+                return message
+            if message is not None:
+                self.messages.put_nowait(message)
+        raise StopAsyncIteration
+
+    async def close(self) -> None:
+        # Como o basic.cancel: o consumidor para e o que nao foi entregue fica na fila.
+        self.closed = True
+        self.messages.put_nowait(None)
+
+
+class StandInChannel:
+    def __init__(self, broker: "StandInBroker"):
+        self.broker = broker
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        return None
+
+    async def get_queue(self, queue_name: str) -> StandInQueue:
+        return self.broker.queues[queue_name]
+
+
+class StandInConnection:
+    def __init__(self, broker: "StandInBroker"):
+        self.broker = broker
+
+    async def channel(self) -> StandInChannel:
+        return StandInChannel(self.broker)
+
+
+class StandInBroker:
+    # Substitui o cliente RabbitMQ do worker com a mesma interface (connection.channel(),
+    # ensure_queue, ensure_delay_queue, publish). Conta as mensagens ainda sem ack/nack
+    # (incluindo as agendadas em filas de atraso) para saber quando a fila foi drenada.
+    def __init__(self, retry_delay_scale: float):
+        self.retry_delay_scale = retry_delay_scale
+        self.codec = get_codec(settings.RABBITMQ_CONTENT_TYPE)
+        self.connection = StandInConnection(self)
+        self.queues: defaultdict[str, StandInQueue] = defaultdict(StandInQueue)
+        self.drained = asyncio.Event()
+        self._delay_targets: dict[str, tuple[str, int]] = {}
+        self._outstanding = 0
+
+    async def ensure_queue(self, queue_name: str, arguments: dict[str, Any] | None = None) -> None:
+        self.queues[queue_name]
+
+    async def ensure_delay_queue(self, target_queue: str, delay_seconds: int) -> str:
+        delay_queue = f"{target_queue}.retry.{delay_seconds}s"
+        self._delay_targets[delay_queue] = (target_queue, delay_seconds)
+        return delay_queue
+
+    async def publish(self, queue_name: str, payload: dict, headers: dict[str, Any] | None = None) -> None:
+        body = self.codec.encode(payload)
+        if queue_name == settings.RABBITMQ_QUEUE_FOLHA_PONTO_BACKUP:
+            return
+        if queue_name in self._delay_targets:
+            target_queue, delay_seconds = self._delay_targets[queue_name]
+            self._outstanding += 1
+            asyncio.get_running_loop().call_later(
+                delay_seconds * self.retry_delay_scale,
+                self._deliver,
+                target_queue,
+                body,
+                headers,
+                False,
+            )
+            return
+        self.enqueue(queue_name, body, headers)
+
+    async def close(self) -> None:
+        return None
+
+    def enqueue(
+        self,
+        queue_name: str,
+        body: bytes,
+        headers: dict[str, Any] | None = None,
+        redelivered: bool = False,
+    ) -> None:
+        self._outstanding += 1
+        self._deliver(queue_name, body, headers, redelivered)
+
+    def settle(self) -> None:
+        self._outstanding -= 1
+        if self._outstanding == 0:
+            self.drained.set()
+
+    def _deliver(
+        self,
+        queue_name: str,
+        body: bytes,
+        headers: dict[str, Any] | None,
+        redelivered: bool,
+    ) -> None:
+        self.queues[queue_name].messages.put_nowait(
+            StandInMessage(self, queue_name, body, headers, redelivered)
+        )
+
+
+class NoDatabaseDeliveryCounter(DeliveryCounterAggregator):
+    async def _write(self, increments: dict[int, int], outcomes: list[dict[str, Any]]) -> list[int]:
+        return []
+
+
+class BenchWorker(MetaQueueWorker):
+    # Worker real; so mede cada mensagem e conta os destinos finais.
+    def __init__(self, use_db: bool):
+        super().__init__()
+        self.use_db = use_db
+        self.latencies: list[float] = []
+        self.sent = 0
+        self.retried = 0
+        self.backed_up = 0
+        if not use_db:
+            self.delivery_counter = NoDatabaseDeliveryCounter(
+                flush_interval_seconds=settings.DELIVERY_COUNTER_FLUSH_INTERVAL_SECONDS,
+                group_commit_seconds=settings.DELIVERY_COUNTER_GROUP_COMMIT_SECONDS,
+            )
+
+    async def _handle_message(self, queue_name: str, message) -> None:
+        started = time.perf_counter()
+        await super()._handle_message(queue_name, message)
+        self.latencies.append(time.perf_counter() - started)
+
+    async def _load_sent_keys(self, keys: set[str]) -> set[str]:
+        if not self.use_db:
+            return set()
+        return await super()._load_sent_keys(keys)
+
+    def _register_delivery_success(self, payload: dict[str, Any], meta_response: dict[str, Any]) -> None:
+        self.sent += 1
+        super()._register_delivery_success(payload, meta_response)
+
+    async def _publish_retry(self, queue_name: str, payload: dict[str, Any], retry_count: int) -> None:
+        await super()._publish_retry(queue_name, payload, retry_count)
+        self.retried += 1
+
+    async def _publish_backup(self, *args, **kwargs) -> None:
+        await super()._publish_backup(*args, **kwargs)
+        self.backed_up += 1
+
+
+def make_payloads(messages: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "name": f"Colaborador {index}",
+            "month_folha_ponto": "01/2026",
+            "whatsapp_number": str(41_900_000_000 + index),
+            "user_id": 1,
+            "template_type": "FP",
+            "message_request_id": 1,
+            "idempotency_key": f"1:{41_900_000_000 + index}",
+            "row_index": index + 2,
+        }
+        for index in range(messages)
+    ]
+
+
+def make_bodies(payloads: list[dict[str, Any]], batch_size: int) -> list[dict[str, Any]]:
+    if batch_size <= 1:
+        return payloads
+    return [
+        {BATCH_ENVELOPE_KEY: payloads[start : start + batch_size]}
+        for start in range(0, len(payloads), batch_size)
+    ]
+
+
+def configure(args: argparse.Namespace) -> None:
+    settings.META_MESSAGES_URL = f"http://127.0.0.1:{args.meta_port}/v22.0/bench/messages"
+    settings.WHATSAPP_TOKEN = "bench-token"
+    settings.META_WORKER_CONCURRENCY = args.concurrency
+    settings.META_WORKER_QUEUE_CONCURRENCY = {}
+    settings.META_RATE_LIMIT_PER_SECOND = args.rate_limit or UNLIMITED_RATE
+    settings.METRICS_WORKER_PORT = 0
+
+
+async def wait_for(worker_task: asyncio.Task, drained) -> None:
+    # Se o worker cair antes de drenar, propaga o erro em vez de esperar para sempre.
+    drained_task = asyncio.ensure_future(drained)
+    done, _ = await asyncio.wait({worker_task, drained_task}, return_when=asyncio.FIRST_COMPLETED)
+    if worker_task in done:
+        drained_task.cancel()
+        await worker_task
+        raise RuntimeError("Worker encerrou antes de drenar a fila")
+
+
+async def stop(worker: BenchWorker, worker_task: asyncio.Task) -> None:
+    # Mesmo encerramento do SIGTERM: para o consumo, drena os envios e grava os contadores.
+    worker.request_shutdown()
+    await asyncio.gather(worker_task, return_exceptions=True)
+
+
+async def run_stand_in(args: argparse.Namespace, payloads: list[dict[str, Any]]) -> tuple[BenchWorker, float]:
+    broker = StandInBroker(retry_delay_scale=args.retry_delay_scale)
+    worker = BenchWorker(use_db=args.db)
+    worker.rabbitmq_client = broker
+    for body in make_bodies(payloads, args.batch_size):
+        broker.enqueue(settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS, broker.codec.encode(body))
+
+    started = time.perf_counter()
+    worker_task = asyncio.create_task(worker.start())
+    try:
+        await wait_for(worker_task, broker.drained.wait())
+        return worker, time.perf_counter() - started
+    finally:
+        await stop(worker, worker_task)
+
+
+async def amqp_backlog(publisher: RabbitMQ, queue_name: str) -> int:
+    queue_names = [queue_name] + [
+        f"{queue_name}.retry.{delay_seconds}s" for delay_seconds in set(settings.META_RETRY_DELAYS_SECONDS)
+    ]
+    backlog = 0
+    for name in queue_names:
+        try:
+            queue = await publisher.channel.declare_queue(name, durable=True, passive=True)
+        except Exception:
+            # Fila de atraso ainda nao declarada (sem retries ate aqui); o canal fecha no erro.
+            await publisher.close()
+            await publisher.connect()
+            continue
+        backlog += queue.declaration_result.message_count
+    return backlog
+
+
+async def run_amqp(args: argparse.Namespace, payloads: list[dict[str, Any]]) -> tuple[BenchWorker, float]:
+    queue_name = settings.RABBITMQ_QUEUE_FOLHA_PONTO_ATIVOS
+    publisher = RabbitMQ()
+    try:
+        await publisher.publish_many(queue_name, payloads, batch_size=args.batch_size)
+        worker = BenchWorker(use_db=args.db)
+
+        async def drained() -> None:
+            while await amqp_backlog(publisher, queue_name) or worker._in_flight:
+                await asyncio.sleep(AMQP_POLL_SECONDS)
+
+        started = time.perf_counter()
+        worker_task = asyncio.create_task(worker.start())
+        try:
+            await wait_for(worker_task, drained())
+            return worker, time.perf_counter() - started
+        finally:
+            await stop(worker, worker_task)
+    finally:
+        await publisher.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=5_000)
+    parser.add_argument("--broker", choices=("stand-in", "amqp"), default="stand-in")
+    parser.add_argument("--concurrency", type=int, default=settings.META_WORKER_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="msg/s do limitador (0 = sem limite)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-delay-scale", type=float, default=0.0)
+    parser.add_argument("--meta-port", type=int, default=8999)
+    parser.add_argument("--db", action="store_true", help="grava contadores e consulta idempotencia no banco")
+    parser.add_argument("--log-level", default="WARNING", help="INFO reproduz o custo de log da producao")
+    parser.add_argument("--no-save", action="store_true", help="nao grava o resultado no historico")
+    args = parser.parse_args()
+
+    configure(args)
+    logging.getLogger().setLevel(args.log_level)
+    fake_meta = start_in_process(
+        FakeMetaConfig(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            error_rate=args.error_rate,
+            throttle_rate=args.throttle_rate,
+        ),
+        port=args.meta_port,
+    )
+    try:
+        payloads = make_payloads(args.messages)
+        run = run_amqp if args.broker == "amqp" else run_stand_in
+        worker, elapsed = asyncio.run(run(args, payloads))
+    finally:
+        fake_meta.terminate()
+        fake_meta.join()
+
+    latencies_ms = [latency * 1000 for latency in worker.latencies]
+    metrics = {
+        "msgs_per_sec": args.messages / elapsed,
+        "elapsed_s": elapsed,
+        "latency_p50_ms": statistics.median(latencies_ms) if latencies_ms else 0.0,
+        "latency_p99_ms": percentile(latencies_ms, 0.99),
+        "peak_rss_mb": peak_rss_mb(),
+        "sent": worker.sent,
+        "retried": worker.retried,
+        "backed_up": worker.backed_up,
+    }
+    params = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in {"meta_port", "no_save"}
+    }
+    params["content_type"] = settings.RABBITMQ_CONTENT_TYPE
+
+    print(
+        f"{args.messages} destinatarios em {elapsed:.2f}s via {args.broker} "
+        f"(concorrencia {args.concurrency}, lote {args.batch_size}, latencia Meta {args.latency_ms:.0f}ms)"
+    )
+    print(f"vazao: {metrics['msgs_per_sec']:.1f} msgs/s")
+    print(f"latencia por mensagem AMQP (ms): p50={metrics['latency_p50_ms']:.1f} p99={metrics['latency_p99_ms']:.1f}")
+    print(f"enviadas={worker.sent} retries={worker.retried} backup={worker.backed_up}")
+    print(f"pico de RSS: {metrics['peak_rss_mb']:.1f} MiB")
+    if not args.no_save:
+        print_comparison(record_result(BENCHMARK_NAME, params, metrics), metrics)
+
+
+if __name__ == "__main__":
+    main()
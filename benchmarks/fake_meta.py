@@ -0,0 +1,127 @@
+"""Servidor local que imita o endpoint de mensagens da Meta Graph API.
+
+Responde POST em qualquer caminho com o formato de sucesso da Cloud API apos
+uma latencia configuravel, injetando erros 500 e throttling (HTTP 429 com o
+codigo 130429) nas taxas pedidas. Usado pelo bench_worker; tambem roda sozinho
+para testes manuais do worker (META_MESSAGES_URL=http://127.0.0.1:8999/messages).
+
+Uso:
+    python -m benchmarks.fake_meta --port 8999 --latency-ms 80 --jitter-ms 40
+    python -m benchmarks.fake_meta --error-rate 0.01 --throttle-rate 0.02
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from dataclasses import dataclass
+
+import httpx
+import uvicorn
+
+JSON_HEADERS = [(b"content-type", b"application/json")]
+THROTTLE_BODY = json.dumps(
+    {"error": {"message": "(#130429) Rate limit hit", "type": "OAuthException", "code": 130429}}
+).encode()
+ERROR_BODY = json.dumps(
+    {"error": {"message": "An unexpected error has occurred.", "type": "OAuthException", "code": 2}}
+).encode()
+
+
+@dataclass(frozen=True)
+class FakeMetaConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    seed: int = 42
+
+
+class FakeMetaApp:
+    # App ASGI minima (sem framework) para que o servidor falso nao seja o gargalo.
+    def __init__(self, config: FakeMetaConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._ids = itertools.count(1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+
+        delay = self.config.latency_ms + self._random.uniform(-1, 1) * self.config.jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+        draw = self._random.random()
+        if draw < self.config.throttle_rate:
+            status, body = 429, THROTTLE_BODY
+        elif draw < self.config.throttle_rate + self.config.error_rate:
+            status, body = 500, ERROR_BODY
+        else:
+            status = 200
+            body = json.dumps(
+                {
+                    "messaging_product": "whatsapp",
+                    "contacts": [{"input": "", "wa_id": ""}],
+                    "messages": [{"id": f"wamid.bench{next(self._ids)}"}],
+                }
+            ).encode()
+
+        await send({"type": "http.response.start", "status": status, "headers": JSON_HEADERS})
+        await send({"type": "http.response.body", "body": body})
+
+
+def serve(config: FakeMetaConfig, host: str, port: int) -> None:
+    uvicorn.run(
+        FakeMetaApp(config),
+        host=host,
+        port=port,
+        log_level="warning",
+        access_log=False,
+        lifespan="off",
+    )
+
+
+def start_in_process(config: FakeMetaConfig, host: str = "127.0.0.1", port: int = 8999) -> multiprocessing.Process:
+    # Processo separado: a CPU do servidor falso nao concorre com o event loop do worker.
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(config, host, port), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            httpx.post(f"http://{host}:{port}/ready", timeout=1 + config.latency_ms / 1000)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Servidor falso da Meta nao respondeu em {host}:{port}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8999)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeMetaConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    serve(config, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Historico de resultados dos benchmarks para comparar execucoes entre commits.
+
+Cada execucao vira uma linha JSON em benchmarks/results/<benchmark>.jsonl com o
+commit, os parametros e as metricas. A comparacao usa a execucao anterior com
+os mesmos parametros.
+"""
+
+import json
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=RESULTS_DIR.parent,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=RESULTS_DIR.parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS. Com children=True, o maior
+    # pico entre os processos filhos ja encerrados e coletados.
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def record_result(
+    benchmark: str,
+    params: dict[str, Any],
+    metrics: dict[str, Any],
+    results_dir: Path = RESULTS_DIR,
+) -> dict[str, Any] | None:
+    # Grava a execucao e devolve a anterior com os mesmos parametros (ou None).
+    results_dir.mkdir(parents=True, exist_ok=True)
+    path = results_dir / f"{benchmark}.jsonl"
+    previous = None
+    if path.exists():
+        with path.open(encoding="utf-8") as history:
+            for line in history:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("params") == params:
+                    previous = entry
+
+    entry = {
+        "benchmark": benchmark,
+        "revision": git_revision(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params,
+        "metrics": metrics,
+    }
+    with path.open("a", encoding="utf-8") as history:
+        history.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return previous
+
+
+def print_comparison(previous: dict[str, Any] | None, metrics: dict[str, Any]) -> None:
+    if previous is None:
+        print("sem execucao anterior com os mesmos parametros para comparar")
+        return
+    print(f"comparado com {previous['revision']} ({previous['recorded_at']}):")
+    for key, value in metrics.items():
+        before = previous["metrics"].get(key)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+            continue
+        print(f"  {key:<28} {before:>12.2f} -> {value:>12.2f} ({(value - before) / before * 100:+.1f}%)")